@@ -0,0 +1,119 @@
+"""
+Compares the search-page parser backends of src/card_parsers.py.
+
+    python benchmarks/bench_card_parsers.py                      # synthetic pages
+    python benchmarks/bench_card_parsers.py --snapshots          # archived pages from data/snapshots
+    python benchmarks/bench_card_parsers.py --html page1.html page2.html
+
+Every backend must return exactly the rows of the "bs4" reference, otherwise the run fails,
+on the benchmarked pages and on a small page with script/style/comment nodes inside fields.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from card_parsers import BACKENDS, parse_cards
+from snapshots import SnapshotStore, load_snapshot
+
+CARD_TEMPLATE = """
+<div data-testid="property-card" class="c066246e13 d8aec464ca" role="listitem">
+  <div class="a5922b8ca1"><div class="c1edfbabcb"><a href="{url}" tabindex="-1"><img src="https://cf.bstatic.com/{i}.jpg" alt="{name}" class="f6c12c77eb" loading="lazy"></a></div></div>
+  <div class="c1edfbabcb"><div class="a1b3f50dcd"><div class="f71ad9d5b5"><h3 class="d6b0f9ce23">
+    <a data-testid="title-link" href="{url}" class="a78ca197d0"><div data-testid="title" class="fa4a3a8221 b121bc708f">{name}</div></a>
+  </h3>
+  <div class="b3f3c831be"><span class="fcd9eec8fb" aria-hidden="true"><svg viewBox="0 0 24 24"><path d="M23.555 8.729a1.505"></path></svg></span></div>
+  <div class="abf093bdfe"><span class="aee5343fdb"><span data-testid="address" class="f419a93f12">{address}</span> <span data-testid="distance">{distance}</span></span></div>
+  <!-- promo block -->
+  <div class="d0522b0cca"><div class="f6431b446c">{blurb}</div></div>
+  </div>
+  <div data-testid="review-score" class="a3b8729ab1 d86cee9b25"><div class="ac4a7896c7">Scored {score_int}</div><div class="f63b14ab7a">{score}</div><div class="abf093bdfe">Very good</div><div class="a3b8729ab1">{reviews} reviews</div></div>
+  </div></div>
+</div>
+"""
+
+# Fields holding markup whose text bs4's get_text() skips: scripts, styles and comments.
+# Always part of the parity check, whatever pages are benchmarked.
+EDGE_PAGE = """<html><body><div id="results">
+<div data-testid="property-card">
+  <a data-testid="title-link" href="/hotel/fr/edge.html"><div data-testid="title">Hôtel<script>x=1</script> du <style>.c{color:red}</style>Port<!-- ad --></div></a>
+  <div data-testid="review-score"><script>var s = "9,9";</script><div>8,4</div></div>
+  <span data-testid="address">2 <b>quai</b> Nord<noscript></noscript></span> <span data-testid="distance"><style>i{}</style>1 km</span>
+</div>
+<div data-testid="property-card"><div data-testid="title">Sans lien</div></div>
+</div></body></html>"""
+
+def synthetic_page(n_cards=25, seed=0):
+    """A search page shaped like Booking.com's markup: deep nesting, long class lists, inline SVG."""
+    rng = random.Random(seed)
+    cards = []
+    for i in range(n_cards):
+        score = f"{rng.uniform(6, 9.9):.1f}".replace(".", ",")
+        cards.append(CARD_TEMPLATE.format(
+            i=i,
+            url=f"https://www.booking.com/hotel/fr/hotel-{seed}-{i}.html?aid=304142&label=gen173nr-{'x' * 120}",
+            name=f"Hôtel n°{i} & Spa",
+            address=f"{rng.randint(1, 120)} rue de la Paix, Ville {seed}",
+            distance=f"{rng.uniform(0.1, 9):.1f} km from centre",
+            blurb="Free cancellation · No prepayment needed " * 3,
+            score=score, score_int=score.split(",")[0], reviews=rng.randint(1, 4000)
+        ))
+    filler = "<script>window.booking = {" + "\"k\": 1, " * 2000 + "};</script>"
+    return f"<html><head>{filler}</head><body><div id='results'>{''.join(cards)}</div></body></html>"
+
+def load_pages(args):
+    if args.html:
+        pages = []
+        for path in args.html:
+            with open(path, "r", encoding="utf-8") as f:
+                pages.append(f.read())
+        return pages
+    if args.snapshots:
+        store = SnapshotStore()
+        return [load_snapshot(store.root, e) for e in store.latest("search")]
+    return [synthetic_page(args.cards, seed) for seed in range(args.pages)]
+
+def bench(backend, pages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for html in pages:
+            parse_cards(html, "Bench", limit=10**6, backend=backend)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snapshots", action="store_true", help="Use archived search pages")
+    parser.add_argument("--html", nargs="*", help="Use these saved HTML files")
+    parser.add_argument("--pages", type=int, default=20, help="Synthetic pages")
+    parser.add_argument("--cards", type=int, default=25, help="Cards per synthetic page")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = load_pages(args)
+    if not pages:
+        sys.exit("❌ No pages to parse.")
+
+    edge_reference = parse_cards(EDGE_PAGE, "Bench", limit=10**6, backend="bs4")
+    reference = [parse_cards(html, "Bench", limit=10**6, backend="bs4") for html in pages]
+    n_cards = sum(n for _, n in reference)
+    print(f"📄 {len(pages)} pages, {n_cards} cards, {sum(len(h) for h in pages) / 1e6:.1f} MB of HTML\n")
+
+    baseline = None
+    for backend in BACKENDS:
+        try:
+            results = [parse_cards(html, "Bench", limit=10**6, backend=backend) for html in pages]
+        except ImportError as e:
+            print(f"{backend:<11} skipped ({e})")
+            continue
+        if results != reference:
+            sys.exit(f"❌ {backend} rows differ from the bs4 reference")
+        if parse_cards(EDGE_PAGE, "Bench", limit=10**6, backend=backend) != edge_reference:
+            sys.exit(f"❌ {backend} rows differ from the bs4 reference on fields with script/style/comments")
+
+        seconds = bench(backend, pages, args.repeat)
+        baseline = baseline or seconds
+        print(f"{backend:<11} {seconds * 1000:8.1f} ms  {n_cards / seconds:9.0f} cards/s  x{baseline / seconds:.1f}")
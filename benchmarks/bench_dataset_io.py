@@ -0,0 +1,63 @@
+"""
+CSV vs Parquet for the master dataset: file size, full load, and column-subset load.
+
+    python benchmarks/bench_dataset_io.py              # kayak_master x100
+    python benchmarks/bench_dataset_io.py --scale 10
+
+Files are written to a temporary directory; the real datasets are only read.
+Replicated rows are exact duplicates, so the Parquet size ratio is optimistic
+(dictionary encoding collapses them); load-time ratios are representative.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import dataset_io
+
+# What etl_sql.py / visualize_maps.py actually need for the city-level view
+SUBSET = ["city", "weather_score", "climate_index", "avg_temp", "total_rain_mm", "latitude", "longitude"]
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=100, help="Replicate the master dataset this many times")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    base = dataset_io.read_dataset("master")
+    df = dataset_io.apply_schema(pd.concat([base] * args.scale, ignore_index=True), "master")
+    print(f"📦 kayak_master x{args.scale}: {len(df):,} rows\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset_io.PATHS["master"] = os.path.join(tmp, "kayak_master")
+        dataset_io.write_dataset(df, "master")
+        csv_path = dataset_io.dataset_path("master", "csv")
+        parquet_path = dataset_io.dataset_path("master")
+        text_cols = {c: "string" for c, t in dataset_io.SCHEMAS["master"].items() if t == "string"}
+
+        rows = [
+            ("CSV", os.path.getsize(csv_path),
+             best_of(lambda: pd.read_csv(csv_path, dtype=text_cols), args.repeat),
+             best_of(lambda: pd.read_csv(csv_path, usecols=SUBSET), args.repeat)),
+            ("Parquet", os.path.getsize(parquet_path),
+             best_of(lambda: pd.read_parquet(parquet_path), args.repeat),
+             best_of(lambda: pd.read_parquet(parquet_path, columns=SUBSET), args.repeat)),
+        ]
+
+    print(f"{'format':<8} {'size':>10} {'full load':>11} {'7-col load':>11}")
+    for name, size, full, subset in rows:
+        print(f"{name:<8} {size / 1e6:8.1f}MB {full * 1000:9.0f}ms {subset * 1000:9.0f}ms")
+    (_, csv_size, csv_full, csv_sub), (_, pq_size, pq_full, pq_sub) = rows
+    print(f"\n⚡ Parquet: {csv_size / pq_size:.1f}x smaller, {csv_full / pq_full:.1f}x faster full load, "
+          f"{csv_sub / pq_sub:.1f}x faster column-subset load")
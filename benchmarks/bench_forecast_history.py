@@ -0,0 +1,99 @@
+"""
+Forecast history queries (src/forecast_history.py) before and after daily compaction.
+
+    python benchmarks/bench_forecast_history.py                     # 60 days x 315 cities, 1 run a day
+    python benchmarks/bench_forecast_history.py --days 120 --runs 4
+
+Builds a synthetic history in a temporary folder (one file per city and run), times the
+queries on the per-city files, compacts every day, times them again, and checks that
+both layouts return the same rows.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import forecast_history as fh
+
+def synthetic_run(cities, fetched_at, rng):
+    """One collector run: 7 daily forecasts per city, starting on the fetch day."""
+    dates = pd.date_range(pd.Timestamp(fetched_at).normalize(), periods=fh.FORECAST_DAYS)
+    rows = len(cities) * len(dates)
+    return pd.DataFrame({
+        "city": np.repeat(cities, len(dates)),
+        "latitude": 45.0,
+        "longitude": 3.0,
+        "date": np.tile(dates, len(cities)),
+        "day_offset": np.tile(np.arange(len(dates)), len(cities)),
+        "temp_day": rng.uniform(-5, 35, rows).round(2),
+        "temp_min": 0.0,
+        "temp_max": 30.0,
+        "weather_main": "Clear",
+        "weather_description": "clear sky",
+        "pop": 0.0,
+        "rain": rng.exponential(1, rows).round(2),
+        "humidity": rng.integers(30, 100, rows)
+    })
+
+def build_history(root, days, cities, runs):
+    rng = np.random.default_rng(0)
+    today = datetime.now(timezone.utc).date()
+    files = 0
+    for d in range(days, 0, -1):
+        day = pd.Timestamp(today - timedelta(days=d))
+        for r in range(runs):
+            fetched_at = day + pd.Timedelta(hours=24 * r // runs)
+            files += fh.append(synthetic_run(cities, fetched_at, rng), fetched_at, root)
+    return files
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def run_queries(root, cities, target):
+    """{query name: (rows, seconds)}"""
+    queries = {
+        "latest, 2 cities": lambda: fh.latest_forecasts(target, target + timedelta(days=6), cities[:2], root=root),
+        "latest, all cities": lambda: fh.latest_forecasts(target, target + timedelta(days=6), root=root),
+        "forecasts_for, all": lambda: fh.forecasts_for(target, root=root),
+        "full scan": lambda: fh.read_history(root=root)
+    }
+    return {name: timed(query) for name, query in queries.items()}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--cities", type=int, default=315)
+    parser.add_argument("--runs", type=int, default=1, help="Collector runs per day")
+    args = parser.parse_args()
+
+    cities = [f"City {i}" for i in range(args.cities)]
+    root = tempfile.mkdtemp(prefix="forecast_history_")
+    try:
+        files, t_build = timed(build_history, root, args.days, cities, args.runs)
+        print(f"🗃️ {files:,} files ({args.days} days x {args.cities} cities x {args.runs} runs) in {t_build:.1f}s")
+        # Target dates in the middle of the history, where the 8-day fetch window is full
+        target = datetime.now(timezone.utc).date() - timedelta(days=args.days // 2)
+
+        before = run_queries(root, cities, target)
+        merged, t_compact = timed(fh.compact_finished, root)
+        print(f"🧱 Compacted {len(merged)} days ({sum(merged.values()):,} files) in {t_compact:.1f}s\n")
+        after = run_queries(root, cities, target)
+
+        print(f"{'query':<22}{'rows':>10}{'per-city files':>16}{'compacted':>12}")
+        for name, ((df_before, t_before), (df_after, t_after)) in zip(before, zip(before.values(), after.values())):
+            key = ["city", "fetched_at", "target_date"]
+            same = df_before.sort_values(key).reset_index(drop=True).equals(df_after.sort_values(key).reset_index(drop=True))
+            if not same:
+                sys.exit(f"❌ '{name}' returns different rows after compaction")
+            print(f"{name:<22}{len(df_after):>10,}{t_before:>15.3f}s{t_after:>11.3f}s")
+        print("\n✅ Same rows before and after compaction")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,71 @@
+"""
+Row-wise (DataFrame.apply) vs vectorized (src/scoring.py) weather scoring.
+
+    python benchmarks/bench_scoring.py                  # 10^6 rows
+    python benchmarks/bench_scoring.py --rows 100000
+
+Speed only: parity between the two implementations (bit-identical values,
+NaN included) is checked by tests/test_scoring.py.
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import process_data as pdata
+from scoring import climate_index, weather_score
+
+def synthetic_forecasts(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "temp_day": rng.uniform(-15, 45, rows).round(2),
+        "rain": np.where(rng.random(rows) < 0.6, 0, rng.exponential(4, rows).round(2)),
+        "humidity": rng.integers(10, 101, rows)
+    })
+    # Values sitting exactly on the branch/clamp boundaries, and missing data
+    edge = pd.DataFrame({
+        "temp_day": [pdata.TARGET_TEMP, 5.0, 45.0, -50.0, 80.0, np.nan, 20.0, 25.0],
+        "rain": [0, 0, 0, 0, 0, 0, np.nan, 1e9],
+        "humidity": [60, 60, 100, 0, 0, 50, 60, 60]
+    })
+    return pd.concat([edge, df], ignore_index=True)
+
+def vectorized(df):
+    ci = climate_index(df["temp_day"], pdata.TARGET_TEMP, pdata.HOT_PENALTY_MULT, pdata.COLD_PENALTY_MULT)
+    ws = weather_score(
+        df["temp_day"], df["rain"], df["humidity"], pdata.TARGET_TEMP, pdata.HOT_PENALTY_MULT,
+        pdata.COLD_PENALTY_MULT, pdata.RAIN_PENALTY_MULT, pdata.HUMID_PENALTY_MULT
+    )
+    return ci, ws
+
+def row_wise(df):
+    ci = df.apply(pdata.calculate_climate_index, axis=1).to_numpy(dtype=float)
+    ws = df.apply(pdata.calculate_weather_score, axis=1).to_numpy(dtype=float)
+    return ci, ws
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10**6)
+    parser.add_argument("--apply-rows", type=int, default=None,
+                        help="Run the slow row-wise path on fewer rows and extrapolate (default: all rows)")
+    args = parser.parse_args()
+
+    df = synthetic_forecasts(args.rows)
+    apply_rows = min(args.apply_rows or len(df), len(df))
+
+    _, t_apply = timed(row_wise, df.iloc[:apply_rows])
+    _, t_vec = timed(vectorized, df)
+
+    t_apply_full = t_apply * len(df) / apply_rows
+    note = "" if apply_rows == len(df) else f" (extrapolated from {apply_rows:,} rows)"
+    print(f"🐢 DataFrame.apply : {t_apply_full:8.3f} s for {len(df):,} rows{note}")
+    print(f"🚀 NumPy vectorized: {t_vec:8.3f} s for {len(df):,} rows")
+    print(f"⚡ Speedup: x{t_apply_full / t_vec:,.0f}")
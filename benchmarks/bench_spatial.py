@@ -0,0 +1,121 @@
+"""
+Per-row loops vs src/spatial.py on synthetic hotels scattered around French cities.
+
+    python benchmarks/bench_spatial.py                  # 300,000 hotels, 315 cities
+    python benchmarks/bench_spatial.py --hotels 50000 --loop-rows 5000
+
+Parity checks: nearest() must pick the same city as a brute-force haversine argmin,
+and GridIndex.within() must return exactly the hotels a full scan keeps.
+"""
+import argparse
+import math
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import spatial
+
+def synthetic_hotels(hotels, cities, seed=0):
+    """Hotels near their city, with some missing coordinates and some scraped in the wrong place."""
+    rng = np.random.default_rng(seed)
+    centroids = pd.DataFrame({
+        "city": [f"City {i}" for i in range(cities)],
+        "latitude": rng.uniform(42.5, 50.5, cities),
+        "longitude": rng.uniform(-4.5, 7.5, cities)
+    })
+    city_idx = rng.integers(0, cities, hotels)
+    df = pd.DataFrame({
+        "city": centroids["city"].to_numpy()[city_idx],
+        "hotel_name": [f"Hotel {i}" for i in range(hotels)],
+        "latitude": centroids["latitude"].to_numpy()[city_idx],
+        "longitude": centroids["longitude"].to_numpy()[city_idx]
+    })
+    df["hotel_lat"] = df["latitude"] + rng.normal(0, 0.03, hotels)
+    df["hotel_lon"] = df["longitude"] + rng.normal(0, 0.04, hotels)
+    wrong = rng.random(hotels) < 0.05
+    df.loc[wrong, "hotel_lat"] = rng.uniform(42.5, 50.5, wrong.sum())
+    df.loc[wrong, "hotel_lon"] = rng.uniform(-4.5, 7.5, wrong.sum())
+    df.loc[rng.random(hotels) < 0.1, ["hotel_lat", "hotel_lon"]] = np.nan
+    return df, centroids
+
+def haversine_row(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * spatial.EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+def row_loop(df, centroids):
+    """The old map placement (iterrows + random jitter) plus a per-row distance and nearest-city check."""
+    coords = list(zip(centroids["city"], centroids["latitude"], centroids["longitude"]))
+    lats, lons, misplaced, nearest_city = [], [], [], []
+    for _, row in df.iterrows():
+        if pd.notna(row["hotel_lat"]) and pd.notna(row["hotel_lon"]):
+            lats.append(row["hotel_lat"])
+            lons.append(row["hotel_lon"])
+            misplaced.append(haversine_row(row["hotel_lat"], row["hotel_lon"], row["latitude"], row["longitude"])
+                             > spatial.MISPLACED_KM)
+            nearest_city.append(min(coords, key=lambda c: haversine_row(row["hotel_lat"], row["hotel_lon"], c[1], c[2]))[0])
+        else:
+            lats.append(row["latitude"] + np.random.uniform(-0.015, 0.015))
+            lons.append(row["longitude"] + np.random.uniform(-0.015, 0.015))
+            misplaced.append(False)
+            nearest_city.append(None)
+    return np.array(misplaced), np.array(nearest_city, dtype=object)
+
+def vectorized(df, centroids):
+    checked = spatial.check_hotels(df, centroids)
+    spatial.map_coordinates(df)
+    return checked["misplaced"].to_numpy(), checked["nearest_city"].to_numpy(dtype=object)
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hotels", type=int, default=300_000)
+    parser.add_argument("--cities", type=int, default=315)
+    parser.add_argument("--loop-rows", type=int, default=2000,
+                        help="Run the slow per-row path on this many hotels and extrapolate")
+    parser.add_argument("--radius", type=float, default=20.0, help="Radius of the query benchmark, in km")
+    parser.add_argument("--queries", type=int, default=50, help="Radius queries (one per city)")
+    args = parser.parse_args()
+
+    df, centroids = synthetic_hotels(args.hotels, args.cities)
+    loop_rows = min(args.loop_rows, len(df))
+
+    (mis_ref, near_ref), t_loop = timed(row_loop, df.iloc[:loop_rows], centroids)
+    (mis_vec, near_vec), t_vec = timed(vectorized, df, centroids)
+    if not np.array_equal(mis_ref, mis_vec[:loop_rows]):
+        sys.exit("❌ misplaced flags differ from the per-row check")
+    same = pd.Series(near_ref).fillna("").to_numpy() == pd.Series(near_vec[:loop_rows]).fillna("").to_numpy()
+    if not same.all():
+        diff = np.flatnonzero(~same)
+        sys.exit(f"❌ nearest city differs on {len(diff)} rows, first at {diff[0]}")
+    print(f"✅ Parity: misplaced flags and nearest cities identical on {loop_rows:,} hotels "
+          f"({mis_vec.sum():,} misplaced out of {len(df):,})")
+
+    t_loop_full = t_loop * len(df) / loop_rows
+    print(f"🐢 Per-row loop      : {t_loop_full:8.3f} s for {len(df):,} hotels (extrapolated from {loop_rows:,})")
+    print(f"🚀 NumPy vectorized  : {t_vec:8.3f} s for {len(df):,} hotels")
+    print(f"⚡ Speedup: x{t_loop_full / t_vec:,.0f}")
+
+    # Radius queries: full scan vs grid index (built once)
+    centers = centroids.head(args.queries)
+    lat, lon = df["hotel_lat"].to_numpy(), df["hotel_lon"].to_numpy()
+    start = time.perf_counter()
+    scanned = [set(np.flatnonzero(spatial.haversine_km(lat, lon, c.latitude, c.longitude) <= args.radius))
+               for c in centers.itertuples()]
+    t_scan = time.perf_counter() - start
+    index, t_build = timed(spatial.GridIndex, lat, lon)
+    start = time.perf_counter()
+    found = [set(index.within(c.latitude, c.longitude, args.radius)[0]) for c in centers.itertuples()]
+    t_grid = time.perf_counter() - start
+    if scanned != found:
+        sys.exit("❌ GridIndex.within() differs from the full scan")
+    print(f"\n✅ Parity: {sum(map(len, found)):,} hotels within {args.radius:g} km of {len(centers)} cities")
+    print(f"🐢 Full scan   : {t_scan * 1000:8.1f} ms for {len(centers)} queries")
+    print(f"🚀 Grid index  : {t_grid * 1000:8.1f} ms for {len(centers)} queries (+ {t_build * 1000:.1f} ms build)")
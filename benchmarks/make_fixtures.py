@@ -0,0 +1,131 @@
+"""
+Writes the fixtures replayed by benchmarks/run_suite.py into benchmarks/fixtures/.
+
+    python benchmarks/make_fixtures.py                 # generated from the committed datasets in data/
+    python benchmarks/make_fixtures.py --snapshots     # real pages: the newest archived ones (data/snapshots)
+
+Writes one Booking search page, one hotel detail page, and the Nominatim and
+One Call responses of one city. Run from the repo root, like the src/ scripts.
+
+The committed fixtures are generated, not recorded: the search page is
+bench_card_parsers.synthetic_page() and the hotel page a template filled with a
+real hotel's coordinates and description, padded to a realistic size. The JSON
+answers are rebuilt from the committed weather dataset. Run with --snapshots
+after a scrape to benchmark against real Booking.com markup instead.
+"""
+import argparse
+import json
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from bench_card_parsers import synthetic_page
+from card_parsers import parse_cards
+from dataset_io import read_dataset
+from enrich_booking import extract_from_html
+from snapshots import SnapshotStore, load_snapshot
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+FIXTURE_FILES = {
+    "search_page": "search_page.html",
+    "hotel_page": "hotel_page.html",
+    "nominatim": "nominatim.json",
+    "onecall": "onecall.json"
+}
+
+# A stand-in for a Booking.com hotel page with what both extraction paths look for: the
+# map's data attribute and the description block, inside filler scripts and nested markup
+HOTEL_PAGE_TEMPLATE = """<html><head><title>{name}</title>{filler}</head><body>
+<div id="hotel_address" class="hp_address_subtitle" data-atlas-latlng="{lat},{lon}" data-source="top_link">{address}</div>
+<div class="hp-gallery">{gallery}</div>
+<div class="hp-description"><div data-testid="property-description" class="a53cbfa6de b3efd73f69">
+<p class="a53cbfa6de">
+{description}
+</p></div></div>
+<script type="application/ld+json">{{"@type": "Hotel", "name": "{name}"}}</script>
+</body></html>"""
+
+def hotel_page(row):
+    gallery = "".join(f'<a class="bh-photo-grid-item" href="#"><img src="https://cf.bstatic.com/{i}.jpg"></a>'
+                      for i in range(40))
+    filler = "<script>window.booking = {" + "\"k\": 1, " * 2000 + "};</script>"
+    return HOTEL_PAGE_TEMPLATE.format(
+        name=row["hotel_name"], lat=row["hotel_lat"], lon=row["hotel_lon"], address=row["city"],
+        gallery=gallery, filler=filler, description=row["description"]
+    )
+
+def onecall_response(city_weather):
+    """The One Call payload get_weather.forecast_rows() turns back into these rows."""
+    daily = []
+    for _, day in city_weather.sort_values("day_offset").iterrows():
+        daily.append({
+            "dt": int(pd.Timestamp(day["date"]).timestamp()),
+            "temp": {"day": day["temp_day"], "min": day["temp_min"], "max": day["temp_max"]},
+            "weather": [{"main": day["weather_main"], "description": day["weather_description"]}],
+            "pop": day["pop"],
+            "rain": day["rain"],
+            "humidity": int(day["humidity"])
+        })
+    first = city_weather.iloc[0]
+    return {"lat": first["latitude"], "lon": first["longitude"], "timezone": "Europe/Paris", "daily": daily}
+
+def from_datasets():
+    """Generated fixtures, filled with a real hotel and a real forecast from the committed datasets."""
+    hotels = read_dataset("booking_enriched").dropna(subset=["hotel_lat", "hotel_lon", "description"])
+    weather = read_dataset("weather")
+    city = weather["city"].iloc[0]
+    city_weather = weather[weather["city"] == city]
+    nominatim = [{
+        "lat": str(city_weather["latitude"].iloc[0]),
+        "lon": str(city_weather["longitude"].iloc[0]),
+        "display_name": f"{city}, France",
+        "type": "administrative"
+    }]
+    return {
+        "search_page": synthetic_page(25, seed=0),
+        "hotel_page": hotel_page(hotels.iloc[0]),
+        "nominatim": nominatim,
+        "onecall": onecall_response(city_weather)
+    }
+
+def from_snapshots():
+    """The newest archived search and detail pages replace the generated ones."""
+    store = SnapshotStore()
+    pages = {}
+    for kind, name in (("search", "search_page"), ("detail", "hotel_page")):
+        entries = store.latest(kind)
+        if not entries:
+            sys.exit(f"❌ No archived {kind} pages in {store.root}")
+        pages[name] = load_snapshot(store.root, max(entries, key=lambda e: e["fetched_at"]))
+    store.close()
+    return pages
+
+def check(fixtures):
+    """The pages must still parse, or the benchmark would time an error path."""
+    hotels, _ = parse_cards(fixtures["search_page"], "Fixture", limit=10**6)
+    if not hotels:
+        sys.exit("❌ No hotel cards found in the search page")
+    lat, lon, _ = extract_from_html(fixtures["hotel_page"])
+    if lat is None or lon is None:
+        sys.exit("❌ No coordinates found in the hotel page")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snapshots", action="store_true", help="Take the HTML pages from data/snapshots")
+    args = parser.parse_args()
+
+    fixtures = from_datasets()
+    if args.snapshots:
+        fixtures.update(from_snapshots())
+    check(fixtures)
+
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for name, filename in FIXTURE_FILES.items():
+        path = os.path.join(FIXTURES_DIR, filename)
+        with open(path, "w", encoding="utf-8") as f:
+            if filename.endswith(".json"):
+                json.dump(fixtures[name], f, indent=2, ensure_ascii=False)
+            else:
+                f.write(fixtures[name])
+        print(f"💾 {path} ({os.path.getsize(path) / 1e3:.1f} kB)")
@@ -0,0 +1,363 @@
+"""
+End-to-end benchmark of every pipeline stage, fully offline.
+
+    python benchmarks/run_suite.py                               # x10 the committed datasets
+    python benchmarks/run_suite.py --scale 10 100 1000           # one run per scale
+    python benchmarks/run_suite.py --stages process sql_load     # (+ the stages they need)
+    python benchmarks/run_suite.py --database-url postgresql+psycopg2://postgres@localhost/bench
+    python benchmarks/run_suite.py --compare benchmarks/results/<previous>.json
+
+Live services are replaced by stand-ins:
+  - Booking.com    -> the fixture pages in benchmarks/fixtures/ (generated, or archived
+                      real pages with make_fixtures.py --snapshots)
+  - Nominatim, One Call -> an in-process HTTP server replaying the fixture JSON
+  - S3             -> moto in-process, or any S3_ENDPOINT_URL (MinIO, moto_server)
+  - RDS            -> a throwaway SQLite file, or --database-url (never the .env database)
+
+The data is the committed dataset (34 cities, 700 hotels) copied `scale` times under
+new city names. Per-page stages only run --sample pages and extrapolate the rest.
+Results are written as JSON; --compare flags stages more than --threshold slower
+than in a previous result file and exits 1.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+# get_weather refuses to import without a key; the stand-in never checks it
+os.environ.setdefault("OPENWEATHER_API_KEY", "bench")
+import db
+import etl_sql
+import geocoding
+import get_weather as gw
+import lake
+import process_data as pdata
+import visualize_maps as vmaps
+import warehouse
+from card_parsers import parse_cards
+from dataset_io import read_dataset
+from enrich_booking import extract_from_html
+from make_fixtures import FIXTURES_DIR, FIXTURE_FILES
+
+try:
+    from moto import mock_aws
+except ImportError:  # only needed for the s3 stage without an S3_ENDPOINT_URL
+    mock_aws = None
+
+# --- CONFIGURATION ---
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+# Stage -> stages whose output it consumes (selected automatically with it)
+STAGES = {
+    "parse_cards": [],
+    "extract_details": [],
+    "weather_api": [],
+    "process": [],
+    "s3_publish": ["process"],
+    "sql_load": ["process"],
+    "sql_read": ["sql_load"],
+    "maps": ["sql_read"]
+}
+CARDS_PER_PAGE = 25
+SAMPLE_PAGES = 2_000
+# Latency added by the HTTP stand-in (s); 0 measures the client alone
+STUB_LATENCY = 0.0
+# A stage this much slower than in the --compare file is a regression
+THRESHOLD = 0.20
+RUN_DATE = "2000-01-01"
+
+def load_fixtures():
+    fixtures = {}
+    for name, filename in FIXTURE_FILES.items():
+        path = os.path.join(FIXTURES_DIR, filename)
+        if not os.path.exists(path):
+            sys.exit(f"❌ Missing fixture {path}. Run python benchmarks/make_fixtures.py first.")
+        with open(path, "r", encoding="utf-8") as f:
+            fixtures[name] = json.load(f) if filename.endswith(".json") else f.read()
+    return fixtures
+
+def scale_datasets(scale):
+    """The committed hotels and forecasts, copied `scale` times ("Collioure", "Collioure 1", ...)."""
+    hotels = read_dataset("booking_enriched")
+    weather = read_dataset("weather")
+    cities = pdata.load_cities()
+
+    def copies(df, n):
+        out = pd.concat([df] * scale, ignore_index=True)
+        k = np.repeat(np.arange(scale), n)
+        suffix = np.where(k == 0, "", " " + k.astype(str))
+        out["city"] = out["city"].astype(str) + suffix
+        if "url" in out.columns:
+            out["url"] = out["url"] + np.where(k == 0, "", "&bench=" + k.astype(str))
+        return out
+
+    all_cities = [city if k == 0 else f"{city} {k}" for k in range(scale) for city in cities]
+    return copies(hotels, len(hotels)), copies(weather, len(weather)), all_cities
+
+def sampled(fn, items, sample):
+    """Runs fn on at most `sample` items; returns (seconds for all items, extrapolated?)."""
+    run = min(len(items), sample)
+    start = time.perf_counter()
+    for item in items[:run]:
+        fn(item)
+    seconds = time.perf_counter() - start
+    return seconds * len(items) / run, run < len(items)
+
+# --- STAGES ---
+# Each takes the shared context dict and returns {"items": n, "seconds": s, ...}
+
+def stage_parse_cards(ctx):
+    n_pages = math.ceil(len(ctx["hotels"]) / CARDS_PER_PAGE)
+    html = ctx["fixtures"]["search_page"]
+    seconds, extrapolated = sampled(lambda _: parse_cards(html, "Bench", CARDS_PER_PAGE), range(n_pages), ctx["sample"])
+    return {"items": n_pages * CARDS_PER_PAGE, "unit": "cards", "seconds": seconds, "extrapolated": extrapolated}
+
+def stage_extract_details(ctx):
+    html = ctx["fixtures"]["hotel_page"]
+    seconds, extrapolated = sampled(lambda _: extract_from_html(html), range(len(ctx["hotels"])), ctx["sample"])
+    return {"items": len(ctx["hotels"]), "unit": "pages", "seconds": seconds, "extrapolated": extrapolated}
+
+def fixture_app(fixtures, latency):
+    """Nominatim (/search) and One Call (/onecall) answering with the fixture responses."""
+    async def search(request):
+        await asyncio.sleep(latency)
+        return web.json_response(fixtures["nominatim"])
+
+    async def onecall(request):
+        await asyncio.sleep(latency)
+        return web.json_response(fixtures["onecall"])
+
+    app = web.Application()
+    app.router.add_get("/search", search)
+    app.router.add_get("/onecall", onecall)
+    return app
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def run_collector(app, port):
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    try:
+        start = time.perf_counter()
+        # The real collector, minus the upstream rate limits the stand-in does not need
+        rows = await gw.collect_weather_async(weather_rate=0, geocode_rate=0)
+        return rows, time.perf_counter() - start
+    finally:
+        await runner.cleanup()
+
+def stage_weather_api(ctx):
+    port = free_port()
+    gw.NOMINATIM_URL = f"http://127.0.0.1:{port}/search"
+    gw.ONECALL_URL = f"http://127.0.0.1:{port}/onecall"
+    gw.NOMINATIM_CONCURRENCY = gw.WEATHER_CONCURRENCY
+    gw.cities = ctx["cities"]
+    # Cold geocode cache in the scratch dir: every city is one /search and one /onecall
+    geocoding._default_cache = geocoding.GeocodeCache(os.path.join(ctx["tmp"], f"geocode-{time.time_ns()}.sqlite"))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows, seconds = asyncio.run(run_collector(fixture_app(ctx["fixtures"], ctx["latency"]), port))
+    geocoding._default_cache.close()
+    if len(rows) != len(ctx["cities"]) * len(ctx["fixtures"]["onecall"]["daily"][:7]):
+        raise RuntimeError(f"weather_api: got {len(rows)} forecast rows for {len(ctx['cities'])} cities")
+    return {"items": 2 * len(ctx["cities"]), "unit": "requests", "seconds": seconds}
+
+def stage_process(ctx):
+    start = time.perf_counter()
+    city_id_map = {city: i + 1 for i, city in enumerate(ctx["cities"])}
+    df_weather = ctx["weather"][pdata.WEATHER_COLUMNS]
+    df_planning = df_weather[df_weather["day_offset"] >= 2].copy()
+    df_master = pdata.build_master(df_planning, ctx["hotels"], city_id_map)
+    df_master["city"] = df_master["city"].astype(str)
+    df_master = df_master.sort_values(by=["weather_score", "city", "score", "url"],
+                                      ascending=[False, True, False, True])
+    seconds = time.perf_counter() - start
+    ctx["master"] = df_master
+    return {"items": len(df_master), "unit": "rows", "seconds": seconds}
+
+def stage_s3_publish(ctx):
+    if lake.S3_ENDPOINT_URL:
+        backend = contextlib.nullcontext()
+    elif mock_aws is not None:
+        backend = mock_aws()
+    else:
+        print("   ⚠️ s3_publish skipped: needs `moto` (pip install moto) or S3_ENDPOINT_URL")
+        return None
+
+    with backend, contextlib.redirect_stdout(io.StringIO()):
+        s3 = lake.get_client()
+        lake.ensure_bucket(s3)
+        start = time.perf_counter()
+        manifest = lake.publish(s3, "master", ctx["master"], RUN_DATE)
+        written = time.perf_counter() - start
+        df = lake.read_lake("master", RUN_DATE, columns=etl_sql.MASTER_COLUMNS)
+        seconds = time.perf_counter() - start
+    if len(df) != len(ctx["master"]):
+        raise RuntimeError(f"s3_publish: read back {len(df)} of {len(ctx['master'])} rows")
+    return {"items": len(df), "unit": "rows", "seconds": seconds, "write_seconds": written,
+            "partitions": len(manifest["partitions"]), "bytes": sum(p["bytes"] for p in manifest["partitions"])}
+
+def stage_sql_load(ctx):
+    start = time.perf_counter()
+    frames = etl_sql.build_frames(etl_sql.add_keys(ctx["master"]), ctx["weather"])
+    with db.connection(begin=True) as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(etl_sql.text(f"SET LOCAL statement_timeout = {etl_sql.LOAD_STATEMENT_TIMEOUT_MS}"))
+        count = etl_sql.load_with_swap(connection, frames)
+    seconds = time.perf_counter() - start
+    return {"items": int(sum(len(f) for f in frames.values())), "unit": "rows", "seconds": seconds, "view_rows": int(count)}
+
+def stage_sql_read(ctx):
+    start = time.perf_counter()
+    with db.connection() as connection:
+        ctx["city_stats"] = warehouse.city_stats(connection)
+        ctx["top_hotels"] = warehouse.top_hotels(connection, vmaps.TOP_CITIES, vmaps.HOTELS_PER_CITY,
+                                                 vmaps.DESCRIPTION_CHARS)
+    seconds = time.perf_counter() - start
+    return {"items": len(ctx["city_stats"]) + len(ctx["top_hotels"]), "unit": "rows", "seconds": seconds}
+
+def stage_maps(ctx):
+    start = time.perf_counter()
+    figures = [vmaps.build_destinations_map(ctx["city_stats"]), vmaps.build_hotels_map(ctx["top_hotels"])]
+    # Serializing is what --build writes and what the browser receives
+    size = sum(len(fig.to_json()) for fig in figures)
+    seconds = time.perf_counter() - start
+    return {"items": len(ctx["city_stats"]) + len(ctx["top_hotels"]), "unit": "points", "seconds": seconds,
+            "json_bytes": size}
+
+STAGE_FUNCTIONS = {
+    "parse_cards": stage_parse_cards,
+    "extract_details": stage_extract_details,
+    "weather_api": stage_weather_api,
+    "process": stage_process,
+    "s3_publish": stage_s3_publish,
+    "sql_load": stage_sql_load,
+    "sql_read": stage_sql_read,
+    "maps": stage_maps
+}
+
+def with_needs(selected):
+    """The selected stages plus everything they consume, in STAGES order."""
+    wanted, todo = set(), list(selected)
+    while todo:
+        name = todo.pop()
+        if name not in wanted:
+            wanted.add(name)
+            todo.extend(STAGES[name])
+    return [name for name in STAGES if name in wanted]
+
+def run_scale(scale, stages, ctx, repeat):
+    hotels, weather, cities = scale_datasets(scale)
+    ctx.update(hotels=hotels, cities=cities, weather=weather)
+    print(f"\n📐 x{scale}: {len(hotels):,} hotels, {len(cities):,} cities, {len(weather):,} forecast rows")
+
+    results = {}
+    for name in stages:
+        best = None
+        for _ in range(repeat):
+            result = STAGE_FUNCTIONS[name](ctx)
+            if result is None or (best is not None and result["seconds"] >= best["seconds"]):
+                continue
+            best = result
+        if best is None:
+            continue
+        best["per_second"] = best["items"] / best["seconds"] if best["seconds"] else None
+        results[name] = best
+        note = " (extrapolated)" if best.get("extrapolated") else ""
+        print(f"   {name:<16} {best['seconds']:9.3f} s  {best['items']:>10,} {best['unit']:<8} "
+              f"{best['per_second'] or 0:12,.0f}/s{note}")
+    return {"scale": scale, "hotels": len(hotels), "cities": len(cities), "stages": results}
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current, previous_path, threshold):
+    """Prints the per-stage ratio to a previous result file. Returns the regressions."""
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = json.load(f)
+    before = {(run["scale"], name): stage["seconds"]
+              for run in previous["runs"] for name, stage in run["stages"].items()}
+
+    print(f"\n🔍 Compared with {previous_path} (commit {previous.get('commit') or '?'}):")
+    if previous.get("database") != current["database"]:
+        print(f"   ⚠️ Different databases ({previous.get('database')} vs {current['database']}), SQL timings are not comparable")
+    regressions = []
+    for run in current["runs"]:
+        for name, stage in run["stages"].items():
+            old = before.get((run["scale"], name))
+            if not old:
+                continue
+            ratio = stage["seconds"] / old
+            flag = "🐢" if ratio > 1 + threshold else ("🚀" if ratio < 1 - threshold else "  ")
+            print(f"   {flag} x{run['scale']:<5} {name:<16} {old:9.3f} s -> {stage['seconds']:9.3f} s  x{ratio:.2f}")
+            if ratio > 1 + threshold:
+                regressions.append((run["scale"], name, ratio))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, nargs="+", default=[10], help="Copies of the committed datasets")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--sample", type=int, default=SAMPLE_PAGES,
+                        help="Max pages actually parsed per HTML stage (the rest is extrapolated)")
+    parser.add_argument("--repeat", type=int, default=1, help="Keep the best of N runs per stage")
+    parser.add_argument("--latency", type=float, default=STUB_LATENCY, help="HTTP stand-in delay per request (s)")
+    parser.add_argument("--database-url", help="SQLAlchemy URL of a scratch database (default: temporary SQLite)")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/suite-<date>-<commit>.json)")
+    parser.add_argument("--compare", help="Previous result file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Slowdown ratio counted as a regression")
+    args = parser.parse_args()
+
+    stages = with_needs(args.stages)
+    with tempfile.TemporaryDirectory(prefix="kayak-bench-") as tmp:
+        # Never the .env database: the load swaps the warehouse tables
+        db.DATABASE_URL = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        ctx = {"fixtures": load_fixtures(), "sample": args.sample, "latency": args.latency, "tmp": tmp}
+        print(f"🏁 Stages: {', '.join(stages)}")
+        print(f"🗄️ Database: {db.get_engine().dialect.name}, S3: "
+              f"{lake.S3_ENDPOINT_URL or ('moto (in-process)' if mock_aws else 'unavailable')}")
+
+        runs = [run_scale(scale, stages, ctx, args.repeat) for scale in args.scale]
+        db.get_engine().dispose()
+
+    commit = git_commit()
+    result = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "database": db.DATABASE_URL.split(":", 1)[0],
+        "runs": runs
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"suite-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{commit or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"\n💾 Results saved to {output}")
+
+    if args.compare:
+        regressions = compare(result, args.compare, args.threshold)
+        if regressions:
+            sys.exit(f"❌ {len(regressions)} stage(s) more than {args.threshold:.0%} slower")
+        print("✅ No regression")
@@ -0,0 +1,146 @@
+import re
+from bs4 import BeautifulSoup
+
+# --- CONFIGURATION ---
+# "bs4" is the original BeautifulSoup/html.parser walk, kept as the reference.
+# "lxml" and "selectolax" (optional dependency) parse in C and visit each card once.
+BACKENDS = ("bs4", "lxml", "selectolax")
+DEFAULT_BACKEND = "lxml"
+
+SCORE_PATTERN = re.compile(r'\d+[.,]\d+')
+
+# (tag, data-testid) -> field, for the single-pass extractors
+CARD_FIELDS = {
+    ("div", "title"): "name",
+    ("a", "title-link"): "link",
+    ("div", "review-score"): "score",
+    ("span", "address"): "address",
+    ("span", "distance"): "distance"
+}
+
+def clean_score(text):
+    """Extracts the first number pattern X.X from text"""
+    if not text:
+        return "N/A"
+    # Search for pattern like 8.5 or 9.0
+    match = SCORE_PATTERN.search(text)
+    if match:
+        return match.group().replace(',', '.')
+    return text  # Return original if no number found
+
+def build_hotel(city, name, link, raw_score, address, distance):
+    """One output row, identical whatever backend produced the raw strings."""
+    # Booking list view doesn't have a full "description", so we combine Address + Location Info
+    parts = [p for p in (address, distance) if p is not None]
+    return {
+        "city": city,
+        "hotel_name": name if name is not None else "Unknown",
+        "url": link,
+        "score": clean_score(raw_score) if raw_score is not None else "N/A",
+        "description": " - ".join(parts) if parts else "No description available"
+    }
+
+def parse_cards_bs4(html, city, limit):
+    soup = BeautifulSoup(html, 'html.parser')
+    cards = soup.find_all("div", {"data-testid": "property-card"})
+
+    hotels = []
+    for card in cards:
+        if len(hotels) >= limit: break
+
+        try:
+            name_el = card.find("div", {"data-testid": "title"})
+            link_el = card.find("a", {"data-testid": "title-link"})
+            score_el = card.find("div", {"data-testid": "review-score"})
+            address_el = card.find("span", {"data-testid": "address"})
+            distance_el = card.find("span", {"data-testid": "distance"})
+
+            hotels.append(build_hotel(
+                city,
+                name_el.get_text(strip=True) if name_el else None,
+                link_el['href'] if link_el else None,
+                score_el.get_text(strip=True) if score_el else None,
+                address_el.get_text(strip=True) if address_el else None,
+                distance_el.get_text(strip=True) if distance_el else None
+            ))
+        except Exception as e:
+            print(f"   ⚠️ Error parsing card: {e}")
+            continue
+
+    return hotels, len(cards)
+
+# Text nodes only (no comments), outside <script>/<style>, like BeautifulSoup's get_text()
+_TEXT_XPATH = './/text()[not(ancestor::script) and not(ancestor::style)]'
+
+def _lxml_text(el):
+    # Same result as BeautifulSoup's get_text(strip=True)
+    return "".join(t.strip() for t in el.xpath(_TEXT_XPATH))
+
+def parse_cards_lxml(html, city, limit):
+    import lxml.html
+
+    tree = lxml.html.fromstring(html)
+    cards = tree.xpath('//div[@data-testid="property-card"]')
+
+    hotels = []
+    for card in cards[:limit]:
+        found = {}
+        # Single pass: every tagged descendant, in document order, first match wins
+        for el in card.xpath('.//*[@data-testid]'):
+            field = CARD_FIELDS.get((el.tag, el.get("data-testid")))
+            if field and field not in found:
+                found[field] = el
+
+        link_el = found.get("link")
+        hotels.append(build_hotel(
+            city,
+            _lxml_text(found["name"]) if "name" in found else None,
+            link_el.get("href") if link_el is not None else None,
+            _lxml_text(found["score"]) if "score" in found else None,
+            _lxml_text(found["address"]) if "address" in found else None,
+            _lxml_text(found["distance"]) if "distance" in found else None
+        ))
+
+    return hotels, len(cards)
+
+def parse_cards_selectolax(html, city, limit):
+    from selectolax.lexbor import LexborHTMLParser
+
+    cards = LexborHTMLParser(html).css('div[data-testid="property-card"]')
+
+    hotels = []
+    for card in cards[:limit]:
+        # get_text() in bs4 skips script/style content; drop those nodes before reading text
+        card.strip_tags(["script", "style"])
+        found = {}
+        for el in card.css('[data-testid]'):
+            field = CARD_FIELDS.get((el.tag, el.attributes.get("data-testid")))
+            if field and field not in found:
+                found[field] = el
+
+        def text(field):
+            return found[field].text(deep=True, separator="", strip=True) if field in found else None
+
+        link_el = found.get("link")
+        hotels.append(build_hotel(
+            city,
+            text("name"),
+            link_el.attributes.get("href") if link_el is not None else None,
+            text("score"),
+            text("address"),
+            text("distance")
+        ))
+
+    return hotels, len(cards)
+
+PARSERS = {
+    "bs4": parse_cards_bs4,
+    "lxml": parse_cards_lxml,
+    "selectolax": parse_cards_selectolax
+}
+
+def parse_cards(html, city, limit, backend=DEFAULT_BACKEND):
+    """Returns (hotels, number of cards on the page) using the chosen parser backend."""
+    if backend not in PARSERS:
+        raise ValueError(f"Unknown parser backend {backend!r}, choose from {BACKENDS}")
+    return PARSERS[backend](html, city, limit)
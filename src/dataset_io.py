@@ -0,0 +1,120 @@
+import os
+import pandas as pd
+
+# --- CONFIGURATION ---
+# Every hand-off between pipeline stages goes through here. Each dataset is stored as
+# typed, compressed Parquet (the fast path) plus a CSV export for notebooks and
+# older tools. Readers prefer Parquet and fall back to the CSV.
+COMPRESSION = "zstd"
+
+SCHEMAS = {
+    "weather": {
+        "city": "category",
+        "latitude": "float64",
+        "longitude": "float64",
+        "day_offset": "int64",
+        "date": "datetime64[ns]",
+        "temp_day": "float64",
+        "temp_min": "float64",
+        "temp_max": "float64",
+        "weather_main": "category",
+        "weather_description": "category",
+        "pop": "float64",
+        "rain": "float64",
+        "humidity": "int64"
+    },
+    "booking": {
+        "city": "category",
+        "hotel_name": "string",
+        "url": "string",
+        "score": "string",  # Raw scraped text ("8.4", "N/A", ...), parsed downstream
+        "description": "string"
+    },
+    "booking_enriched": {
+        "city": "category",
+        "hotel_name": "string",
+        "url": "string",
+        "score": "string",
+        "description": "string",
+        "hotel_lat": "float64",
+        "hotel_lon": "float64"
+    },
+    "master": {
+        "city_id": "Int64",
+        "city": "category",
+        "hotel_name": "string",
+        "url": "string",
+        "score": "string",
+        "description": "string",
+        "hotel_lat": "float64",
+        "hotel_lon": "float64",
+        "weather_score": "float64",
+        "climate_index": "float64",
+        "avg_temp": "float64",
+        "total_rain_mm": "float64",
+        "latitude": "float64",
+        "longitude": "float64"
+    }
+}
+
+PATHS = {
+    "weather": "data/raw/weather_data",
+    "booking": "data/raw/booking_data",
+    "booking_enriched": "data/processed/booking_data_enriched",
+    "master": "data/processed/kayak_master"
+}
+
+def dataset_path(name, fmt="parquet"):
+    return f"{PATHS[name]}.{fmt}"
+
+def apply_schema(df, name):
+    """Casts the known columns of `df` to the dataset's types; unknown columns are left alone."""
+    schema = SCHEMAS[name]
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        if dtype.startswith("datetime"):
+            df[col] = pd.to_datetime(df[col])
+        elif str(df[col].dtype) != dtype:
+            df[col] = df[col].astype(dtype)
+    return df
+
+def _atomic(path, write):
+    tmp_path = path + ".tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+def write_dataset(df, name, csv=True):
+    """Writes Parquet (and, unless csv=False, the CSV export). Each file is replaced atomically."""
+    os.makedirs(os.path.dirname(PATHS[name]), exist_ok=True)
+    df = apply_schema(df.copy(), name)
+    if csv:
+        _atomic(dataset_path(name, "csv"), lambda p: df.to_csv(p, index=False))
+    # Parquet last, so it is never older than the CSV export (see read_dataset)
+    _atomic(dataset_path(name), lambda p: df.to_parquet(p, index=False, compression=COMPRESSION))
+    return dataset_path(name)
+
+def dataset_exists(name):
+    return os.path.exists(dataset_path(name)) or os.path.exists(dataset_path(name, "csv"))
+
+def read_dataset(name, columns=None):
+    """
+    Loads a dataset, reading only `columns` when given.
+    Raises FileNotFoundError (like pd.read_csv) when neither format exists.
+    """
+    parquet_path = dataset_path(name)
+    csv_path = dataset_path(name, "csv")
+
+    # Parquet is only trusted if it is at least as new as the CSV (someone may have edited the CSV by hand)
+    if os.path.exists(parquet_path) and (
+        not os.path.exists(csv_path) or os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path)
+    ):
+        return pd.read_parquet(parquet_path, columns=columns)
+
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"No such dataset: {parquet_path} or {csv_path}")
+
+    # Text columns are read as text so values like "10" or "N/A" survive the round trip unchanged
+    text_cols = {col: "string" for col, dtype in SCHEMAS[name].items() if dtype == "string"}
+    df = pd.read_csv(csv_path, usecols=columns, dtype=text_cols)
+    return apply_schema(df, name)
@@ -2,122 +2,398 @@ import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import InvalidSessionIdException
-from selenium.webdriver.common.by import By 
-import time
+from selenium.common.exceptions import InvalidSessionIdException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from requests.adapters import HTTPAdapter
+import requests
+import lxml.etree
+import lxml.html
+import argparse
+import threading
+import queue
 import re
 import os
+from concurrent.futures import ProcessPoolExecutor
+from dataset_io import dataset_exists, dataset_path, read_dataset, write_dataset
+from journal import Journal, FSYNC_POLICIES
+from snapshots import SnapshotStore, load_snapshot
+import instrumentation
 
 # 🛠️ TEST MODE: Set to a number (e.g., 5) to test only a few lines. Set to None for production.
 TEST_LIMIT = None
 
-def init_driver():
+# Number of parallel workers (override with --workers)
+WORKERS = 4
+# "auto": plain HTTP first, Selenium only when the static HTML is incomplete
+# "http": never start Chrome / "selenium": always use Chrome (the original behaviour)
+FETCH_MODES = ("auto", "http", "selenium")
+FETCH_MODE = "auto"
+HTTP_TIMEOUT = 15
+# Max seconds to wait for the coordinates or the description to show up
+PAGE_TIMEOUT = 10
+# A URL is retried on a fresh browser this many times after a crash
+MAX_ATTEMPTS = 2
+# Journal fsync policy (see journal.py): "always", "batch" or "never"
+FSYNC = "batch"
+
+FILE_PATH = dataset_path("booking_enriched")
+# Every finished hotel is appended here; it is folded into the enriched dataset once at the end
+JOURNAL_PATH = "data/processed/booking_data_enriched.journal.jsonl"
+NOT_AVAILABLE = "Description not available"
+
+# Booking.com changes its DOM frequently. We try the 3 most common modern selectors.
+DESCRIPTION_SELECTORS = [
+    (By.CSS_SELECTOR, '[data-testid="property-description"]'),
+    (By.ID, "property_description_content"),
+    (By.CSS_SELECTOR, ".hotel_description_wrapper_exp")
+]
+# Same three selectors for the static-HTML path
+DESCRIPTION_XPATHS = [
+    '//*[@data-testid="property-description"]',
+    '//*[@id="property_description_content"]',
+    '//*[contains(concat(" ", normalize-space(@class), " "), " hotel_description_wrapper_exp ")]'
+]
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
+HTTP_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "en-GB,en;q=0.9"
+}
+
+def init_driver(headless=True):
     options = webdriver.ChromeOptions()
-    options.add_argument("--start-maximized")
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36")
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1920,1080")
+    else:
+        options.add_argument("--start-maximized")
+    options.add_argument(f"user-agent={USER_AGENT}")
     service = Service(ChromeDriverManager().install())
     return webdriver.Chrome(service=service, options=options)
 
-def enrich_coordinates_resume():
-    os.makedirs("data/processed", exist_ok=True)
-    file_path = "data/processed/booking_data_enriched.csv"
-    
+def page_ready(driver):
+    """Wait condition: the page has coordinates or one of the description blocks."""
+    if driver.find_elements(By.CSS_SELECTOR, "[data-atlas-latlng]"):
+        return True
+    return any(driver.find_elements(by_type, selector) for by_type, selector in DESCRIPTION_SELECTORS)
+
+def extract_coords(html):
+    """Returns (lat, lon) from the page source, or (None, None)."""
+    latlng_match = re.search(r'data-atlas-latlng="([0-9.-]+),([0-9.-]+)"', html)
+    if latlng_match:
+        return float(latlng_match.group(1)), float(latlng_match.group(2))
+
+    lat_match = re.search(r'"latitude"[:\s]+"?([0-9.-]+)"?', html)
+    lon_match = re.search(r'"longitude"[:\s]+"?([0-9.-]+)"?', html)
+    if lat_match and lon_match:
+        return float(lat_match.group(1)), float(lon_match.group(1))
+    return None, None
+
+def extract_from_html(html):
+    """Static-HTML version of extract_hotel_details(): no browser, lxml instead of the DOM."""
+    lat, lon = extract_coords(html)
+
+    clean_desc = NOT_AVAILABLE
+    tree = lxml.html.fromstring(html)
+    for xpath in DESCRIPTION_XPATHS:
+        desc_elements = tree.xpath(xpath)
+        if desc_elements:
+            # Collapse the source whitespace the way the browser's rendered .text would
+            text = " ".join(desc_elements[0].text_content().split())
+            if text:
+                clean_desc = text
+                break
+
+    return lat, lon, clean_desc
+
+def extract_hotel_details(driver):
+    """Returns (lat, lon, description) for the page currently loaded in the driver."""
+    try:
+        WebDriverWait(driver, PAGE_TIMEOUT).until(page_ready)
+    except TimeoutException:
+        pass  # Extract whatever is there, the JSON coordinates may still be in the source
+
+    # --- A. Grab Coordinates ---
+    lat, lon = extract_coords(driver.page_source)
+
+    # --- B. Grab Description with Robust Fallbacks ---
+    clean_desc = NOT_AVAILABLE
+    for by_type, selector_string in DESCRIPTION_SELECTORS:
+        desc_elements = driver.find_elements(by_type, selector_string)
+        if desc_elements and desc_elements[0].text.strip():
+            # Extract, strip, and remove newlines
+            clean_desc = desc_elements[0].text.strip().replace('\n', ' ')
+            break # Found it! Stop looking through the fallback list.
+
+    return lat, lon, clean_desc
+
+def init_session(pool_size=WORKERS):
+    """Keep-alive HTTP client for the lightweight fetch mode."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HTTP_HEADERS)
+    return session
+
+def fetch_over_http(session, url, store):
+    """Returns (lat, lon, description), or None when the static HTML is missing coords or description."""
+    with instrumentation.request("booking") as call:
+        r = session.get(url, timeout=HTTP_TIMEOUT)
+        call["status"] = r.status_code
+    if r.status_code != 200:
+        return None
+    with instrumentation.timer("snapshot"):
+        store.save("detail", url, r.text, fetched_with="http")
+    with instrumentation.timer("parse"):
+        lat, lon, desc = extract_from_html(r.text)
+    if lat is None or desc == NOT_AVAILABLE:
+        return None
+    return lat, lon, desc
+
+class ModeCounters:
+    """Thread-safe tally of how each hotel page was resolved."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def add(self, name):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+        instrumentation.count("fetch_mode", outcome=name)
+
+    def report(self):
+        http_ok = self.counts.get("http_ok", 0)
+        fallback = self.counts.get("selenium_fallback", 0)
+        attempted = http_ok + fallback
+        rate = (fallback / attempted * 100) if attempted else 0
+        print("📈 Fetch modes: " + ", ".join(f"{k}={v}" for k, v in sorted(self.counts.items())))
+        if attempted:
+            print(f"   Selenium fallback used for {fallback}/{attempted} pages ({rate:.0f}%)")
+
+def scrape_worker(worker_id, work_queue, result_queue, stop_event, headless, mode, counters, store):
+    """
+    Pulls (row, url, attempt) jobs until the queue is empty.
+    In "auto" mode each page is first fetched over plain HTTP; Chrome is only started
+    (once, then kept for this worker) for pages whose static HTML isn't enough.
+    Results go to result_queue: only the main thread touches the DataFrame.
+    """
+    session = init_session() if mode in ("http", "auto") else None
+    driver = None
+    try:
+        while not stop_event.is_set():
+            try:
+                i, url, attempt = work_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            try:
+                if session is not None:
+                    # Connection resets, timeouts, TLS and parse errors fall back to Chrome like an incomplete page
+                    try:
+                        result, http_error = fetch_over_http(session, url, store), "static HTML incomplete"
+                    except (requests.RequestException, lxml.etree.LxmlError, ValueError) as e:
+                        result, http_error = None, f"{type(e).__name__}: {e}"
+                        instrumentation.log("http_failed", worker=worker_id, url=url, error=http_error)
+                    if result is not None:
+                        counters.add("http_ok")
+                        result_queue.put((i, *result, None))
+                        continue
+                    if mode == "http":
+                        counters.add("http_failed")
+                        result_queue.put((i, None, None, None, http_error))
+                        continue
+                    counters.add("selenium_fallback")
+
+                if driver is None:
+                    with instrumentation.timer("browser_start"):
+                        driver = init_driver(headless)
+                with instrumentation.request("booking_browser"), instrumentation.timer("page_load"):
+                    driver.get(url)
+                with instrumentation.timer("extract"):
+                    lat, lon, desc = extract_hotel_details(driver)
+                with instrumentation.timer("snapshot"):
+                    store.save("detail", url, driver.page_source, fetched_with="selenium")
+                counters.add("selenium_ok" if lat is not None else "selenium_incomplete")
+                result_queue.put((i, lat, lon, desc, None))
+
+            except InvalidSessionIdException:
+                print(f"   🔄 Worker {worker_id}: browser crashed! Restarting Chrome...")
+                instrumentation.count("browser_restarts")
+                instrumentation.log("browser_crash", worker=worker_id, url=url, attempt=attempt)
+                try: driver.quit()
+                except: pass
+                driver = init_driver(headless)
+                if attempt + 1 < MAX_ATTEMPTS:
+                    instrumentation.count("retries", upstream="booking_browser")
+                    work_queue.put((i, url, attempt + 1))
+                else:
+                    result_queue.put((i, None, None, None, "browser crashed"))
+
+            except Exception as e:
+                counters.add("errors")
+                instrumentation.log("page_failed", worker=worker_id, url=url, error=str(e))
+                result_queue.put((i, None, None, None, str(e)))
+    finally:
+        if session is not None:
+            session.close()
+        if driver is not None:
+            try: driver.quit()
+            except: pass
+
+def apply_result(df, record):
+    i = record['row']
+    # Rows are keyed by position; the URL check guards against a regenerated booking_data.csv
+    if i >= len(df) or df.loc[i, 'url'] != record['url']:
+        return False
+    if record['hotel_lat'] is not None:
+        df.at[i, 'hotel_lat'] = record['hotel_lat']
+        df.at[i, 'hotel_lon'] = record['hotel_lon']
+    df.at[i, 'description'] = record['description']
+    return True
+
+def load_enrichment_frame(journal):
+    """Last compacted dataset (or the raw scrape), with any journaled results replayed on top."""
     # 1. Load Data
-    if os.path.exists(file_path):
+    if dataset_exists("booking_enriched"):
         print("🔄 Found existing enriched file. Resuming where we left off...")
-        df = pd.read_csv(file_path)
+        df = read_dataset("booking_enriched")
     else:
         print("🔄 No enriched file found. Starting fresh...")
-        df = pd.read_csv("data/raw/booking_data.csv")
+        df = read_dataset("booking")
         df['hotel_lat'] = None
         df['hotel_lon'] = None
-        
+
     if 'description' not in df.columns:
         df['description'] = None
-        
+
     df['description'] = df['description'].astype('object')
 
-    driver = init_driver()
+    # Replay results from an interrupted run (cost grows with the journal, not with the CSV)
+    replayed = sum(apply_result(df, record) for record in journal.replay())
+    if replayed:
+        print(f"📜 Replayed {replayed} results from {JOURNAL_PATH}")
+    return df
+
+def enrich_coordinates_resume(workers=WORKERS, headless=True, fsync=FSYNC, mode=FETCH_MODE):
+    os.makedirs("data/processed", exist_ok=True)
+    file_path = FILE_PATH
+
+    journal = Journal(JOURNAL_PATH, fsync=fsync)
+    df = load_enrichment_frame(journal)
+    store = SnapshotStore()
+
     total = TEST_LIMIT if TEST_LIMIT and TEST_LIMIT < len(df) else len(df)
-    
+
     print(f"📍 Checking {total} hotels for missing data...\n")
 
+    # 2. Queue every row that is still missing something
+    work_queue = queue.Queue()
+    for i in range(total):
+        # Skip ONLY if we already successfully scraped BOTH coordinates AND description
+        has_coords = pd.notna(df.loc[i, 'hotel_lat'])
+        has_desc = pd.notna(df.loc[i, 'description']) and df.loc[i, 'description'] != NOT_AVAILABLE
+        url = df.loc[i, 'url']
+        if (has_coords and has_desc) or pd.isna(url):
+            continue
+        work_queue.put((i, url, 0))
+
+    todo = work_queue.qsize()
+    workers = max(1, min(workers, todo))
+    print(f"🧵 {todo} hotels to scrape with {workers} worker(s), fetch mode '{mode}'\n")
+
+    result_queue = queue.Queue()
+    stop_event = threading.Event()
+    counters = ModeCounters()
+    threads = [
+        threading.Thread(target=scrape_worker, args=(w + 1, work_queue, result_queue, stop_event, headless, mode, counters, store),
+                         daemon=True)
+        for w in range(workers)
+    ] if todo else []
+    for t in threads:
+        t.start()
+
+    # 3. Merge results as they arrive (single writer, so no races on the DataFrame or the CSV)
+    done = 0
     try:
-        for i in range(total):
-            # Skip ONLY if we already successfully scraped BOTH coordinates AND description
-            has_coords = pd.notna(df.loc[i, 'hotel_lat'])
-            has_desc = pd.notna(df.loc[i, 'description']) and df.loc[i, 'description'] != "Description not available"
-            
-            if has_coords and has_desc:
+        while done < todo and (any(t.is_alive() for t in threads) or not result_queue.empty()):
+            try:
+                i, lat, lon, desc, error = result_queue.get(timeout=1)
+            except queue.Empty:
                 continue
-                
-            url = df.loc[i, 'url']
-            if pd.isna(url):
+            done += 1
+
+            if error:
+                print(f"[{done}/{todo}] ❌ Error on {df.loc[i, 'hotel_name']}: {error}")
                 continue
-                
-            try:
-                driver.get(url)
-                time.sleep(2) # Let page load
-                html = driver.page_source
-                
-                # --- A. Grab Coordinates ---
-                latlng_match = re.search(r'data-atlas-latlng="([0-9.-]+),([0-9.-]+)"', html)
-                lat_match = re.search(r'"latitude"[:\s]+"?([0-9.-]+)"?', html)
-                lon_match = re.search(r'"longitude"[:\s]+"?([0-9.-]+)"?', html)
-
-                if latlng_match:
-                    df.at[i, 'hotel_lat'] = float(latlng_match.group(1))
-                    df.at[i, 'hotel_lon'] = float(latlng_match.group(2))
-                elif lat_match and lon_match:
-                    df.at[i, 'hotel_lat'] = float(lat_match.group(1))
-                    df.at[i, 'hotel_lon'] = float(lon_match.group(1))
-                
-                # --- B. 🌟 NEW: Grab Description with Robust Fallbacks ---
-                clean_desc = "Description not available"
-                
-                # Booking.com changes its DOM frequently. We try the 3 most common modern selectors.
-                selectors = [
-                    (By.CSS_SELECTOR, '[data-testid="property-description"]'),
-                    (By.ID, "property_description_content"),
-                    (By.CSS_SELECTOR, ".hotel_description_wrapper_exp")
-                ]
-                
-                for by_type, selector_string in selectors:
-                    desc_elements = driver.find_elements(by_type, selector_string)
-                    if desc_elements and desc_elements[0].text.strip():
-                        # Extract, strip, and remove newlines
-                        clean_desc = desc_elements[0].text.strip().replace('\n', ' ')
-                        break # Found it! Stop looking through the fallback list.
-                        
-                df.at[i, 'description'] = clean_desc
-
-                # --- C. 🌟 NEW: Enhanced Print Statement ---
-                lat = df.loc[i, 'hotel_lat']
-                lon = df.loc[i, 'hotel_lon']
-                # Create a 40-character snippet of the description for the terminal
-                desc_snippet = clean_desc[:40] + "..." if clean_desc != "Description not available" else "❌ Not Found"
-                
-                print(f"[{i+1}/{total}] ✅ {df.loc[i, 'hotel_name']} | Coords: ({lat}, {lon}) | Desc: {desc_snippet}")
-                
-                # 2. AUTO-SAVE every 10 hotels
-                if i % 10 == 0:
-                    df.to_csv(file_path, index=False)
-                    
-            except InvalidSessionIdException:
-                print(f"[{i+1}/{total}] 🔄 Browser crashed! Restarting Chrome...")
-                try: driver.quit() 
-                except: pass
-                driver = init_driver()
-                
-            except Exception as e:
-                print(f"[{i+1}/{total}] ❌ Error: {e}")
-                
+
+            record = {'row': int(i), 'url': df.loc[i, 'url'], 'hotel_lat': lat, 'hotel_lon': lon, 'description': desc}
+            with instrumentation.timer("write"):
+                journal.append(record)
+                apply_result(df, record)
+
+            # Create a 40-character snippet of the description for the terminal
+            desc_snippet = desc[:40] + "..." if desc != NOT_AVAILABLE else "❌ Not Found"
+            print(f"[{done}/{todo}] ✅ {df.loc[i, 'hotel_name']} | Coords: ({df.loc[i, 'hotel_lat']}, {df.loc[i, 'hotel_lon']}) | Desc: {desc_snippet}")
+
     finally:
-        try: driver.quit() 
-        except: pass
-        # Final save
-        df.to_csv(file_path, index=False)
+        stop_event.set()
+        for t in threads:
+            t.join(timeout=PAGE_TIMEOUT + 30)
+        # Compact: one atomic dataset write, then the journal is no longer needed
+        journal.close()
+        with instrumentation.timer("write"):
+            write_dataset(df, "booking_enriched")
+        journal.discard()
+        store.close()
         print(f"\n🎉 Scraping finished! File safely saved to {file_path}")
+        counters.report()
+
+def parse_detail_snapshot(job):
+    root, entry = job
+    return entry["url"], extract_from_html(load_snapshot(root, entry))
+
+def enrich_from_snapshots(processes=None):
+    """Re-runs the detail extraction over archived hotel pages, one CPU core per process. No network."""
+    journal = Journal(JOURNAL_PATH)
+    df = load_enrichment_frame(journal)
+    store = SnapshotStore()
+
+    rows_by_url = {}
+    for i, url in df['url'].items():
+        rows_by_url.setdefault(url, []).append(i)
+    entries = [e for e in store.latest("detail") if e["url"] in rows_by_url]
+    print(f"🗄️ Re-parsing {len(entries)} archived hotel pages...")
+
+    updated = 0
+    with ProcessPoolExecutor(max_workers=processes) as pool, instrumentation.timer("parse"):
+        jobs = [(store.root, e) for e in entries]
+        for url, (lat, lon, desc) in pool.map(parse_detail_snapshot, jobs, chunksize=16):
+            for i in rows_by_url[url]:
+                apply_result(df, {'row': i, 'url': url, 'hotel_lat': lat, 'hotel_lon': lon, 'description': desc})
+                updated += 1
+
+    with instrumentation.timer("write"):
+        write_dataset(df, "booking_enriched")
+    journal.discard()
+    print(f"✅ Re-extracted {updated} hotels into {FILE_PATH}")
 
 if __name__ == "__main__":
-    enrich_coordinates_resume()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Scrape coordinates and descriptions for every hotel URL")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Number of parallel workers (each may own a Chrome)")
+    parser.add_argument("--mode", choices=FETCH_MODES, default=FETCH_MODE, help="How hotel pages are fetched")
+    parser.add_argument("--show-browser", action="store_true", help="Run Chrome with a visible window")
+    parser.add_argument("--fsync", choices=FSYNC_POLICIES, default=FSYNC, help="Journal durability policy")
+    parser.add_argument("--from-snapshots", action="store_true",
+                        help="Re-extract from data/snapshots instead of fetching (no network)")
+    parser.add_argument("--processes", type=int, default=None, help="Parser processes for --from-snapshots")
+    instrumentation.add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with instrumentation.stage("enrich", args.profile):
+        if args.from_snapshots:
+            enrich_from_snapshots(args.processes)
+        else:
+            enrich_coordinates_resume(workers=args.workers, headless=not args.show_browser, fsync=args.fsync, mode=args.mode)
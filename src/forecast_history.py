@@ -0,0 +1,223 @@
+import os
+import re
+import glob
+import shutil
+import argparse
+from datetime import date, datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from dataset_io import COMPRESSION, apply_schema, dataset_path, read_dataset
+
+# --- CONFIGURATION ---
+# Append-only history of every forecast ever fetched, one folder per fetch day and city:
+#   data/history/forecasts/fetch_date=2026-02-19/city=collioure/part-20260219T060000.parquet
+# Each collector run adds one file per city. Once a day is over, compact() merges its
+# files into fetch_date=.../compacted.parquet, sorted by city: a year of hourly runs is
+# then 365 files, and a city query only decodes the row groups whose min/max cover it.
+# Files appended to a day after its compaction (e.g. --backfill) are read alongside the
+# compacted file until the next compact() merges them in.
+HISTORY_DIR = "data/history/forecasts"
+COMPACTED_NAME = "compacted.parquet"
+# Rows per row group in compacted files (~60 cities of 24 hourly runs each)
+ROW_GROUP_ROWS = 10_000
+# Days of forecast kept per fetch (day_offset 0..6). Fetch days are UTC while daily[0] is
+# the city's local day, which is already tomorrow for a late-evening run east of UTC: a
+# forecast for day D is issued by fetches from D - 7 to D, the partitions a query opens
+FORECAST_DAYS = 7
+# Partition files read in parallel
+WORKERS = 8
+
+def city_slug(city):
+    return re.sub(r"[^a-z0-9]+", "_", str(city).lower()).strip("_")
+
+def _as_date(value):
+    if value is None or isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    return pd.Timestamp(value).date()
+
+# --- WRITER ---
+def _write_city(path, df):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path, compression=COMPRESSION)
+    os.replace(tmp_path, path)
+
+def append(df, fetched_at=None, root=HISTORY_DIR, workers=WORKERS):
+    """
+    Adds one collector run (rows shaped like the weather dataset) to the history.
+    Returns the number of files written.
+    """
+    if df.empty:
+        return 0
+    fetched_at = pd.Timestamp(fetched_at or datetime.now(timezone.utc).replace(tzinfo=None)).floor("s")
+    df = df.copy()
+    # Plain strings: every file gets the same schema, whatever the categories of this run
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(str)
+    df["date"] = pd.to_datetime(df["date"])
+    df["target_date"] = df["date"].dt.date
+    df["fetched_at"] = fetched_at
+
+    fetch_dir = os.path.join(root, f"fetch_date={fetched_at.date().isoformat()}")
+    name = f"part-{fetched_at:%Y%m%dT%H%M%S}.parquet"
+    jobs = [(os.path.join(fetch_dir, f"city={city_slug(city)}", name), rows)
+            for city, rows in df.groupby("city", sort=False)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda job: _write_city(*job), jobs))
+    return len(jobs)
+
+def compact(fetch_date, root=HISTORY_DIR):
+    """
+    Merges every file of a finished fetch day (and its compacted.parquet, if any) into one
+    compacted.parquet sorted by city and fetch time. Returns the number of files merged.
+    Rows are deduplicated on (city, fetched_at, target_date): if a crash leaves merged files
+    behind, readers see those rows twice only until the next compact().
+    """
+    fetch_date = _as_date(fetch_date)
+    if fetch_date >= datetime.now(timezone.utc).date():
+        raise ValueError(f"{fetch_date} is not over yet, only past fetch days can be compacted")
+    day_dir = os.path.join(root, f"fetch_date={fetch_date.isoformat()}")
+    city_dirs = sorted(glob.glob(os.path.join(day_dir, "city=*")))
+    target = os.path.join(day_dir, COMPACTED_NAME)
+    parts = [path for city_dir in city_dirs for path in glob.glob(os.path.join(city_dir, "part-*.parquet"))]
+    if not parts:
+        return 0
+
+    sources = ([target] if os.path.exists(target) else []) + parts
+    df = ds.dataset(sources, format="parquet").to_table().to_pandas()
+    df = df.drop_duplicates(["city", "fetched_at", "target_date"], keep="last")
+    df = df.sort_values(["city", "fetched_at"], kind="stable")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = target + ".tmp"
+    pq.write_table(table, tmp_path, compression=COMPRESSION, row_group_size=ROW_GROUP_ROWS)
+    os.replace(tmp_path, target)
+    for city_dir in city_dirs:
+        shutil.rmtree(city_dir)
+    return len(parts)
+
+def compact_finished(root=HISTORY_DIR):
+    """Compacts every finished fetch day that still has uncompacted files. Returns {day: files merged}."""
+    today = datetime.now(timezone.utc).date()
+    merged = {}
+    for day in fetch_dates(root, end=today - timedelta(days=1)):
+        n = compact(day, root)
+        if n:
+            merged[day] = n
+    return merged
+
+# --- READER ---
+def fetch_dates(root=HISTORY_DIR, start=None, end=None):
+    """Fetch days present in the history, oldest first, within [start, end]."""
+    if not os.path.isdir(root):
+        return []
+    start, end = _as_date(start), _as_date(end)
+    days = []
+    for name in os.listdir(root):
+        if not name.startswith("fetch_date="):
+            continue
+        day = date.fromisoformat(name.split("=", 1)[1])
+        if (start is None or day >= start) and (end is None or day <= end):
+            days.append(day)
+    return sorted(days)
+
+def partition_files(root=HISTORY_DIR, start=None, end=None, cities=None):
+    """
+    Files of the fetch days in [start, end] and of `cities` (all when None). Pruning happens
+    on the directory names, so only the matching folders are ever listed. A compacted day
+    is one file, plus any city folder appended after compaction; its rows for other cities
+    are skipped by the row-group filter in read_history().
+    """
+    files = []
+    for day in fetch_dates(root, start, end):
+        day_dir = os.path.join(root, f"fetch_date={day.isoformat()}")
+        compacted = os.path.join(day_dir, COMPACTED_NAME)
+        if os.path.exists(compacted):
+            files.append(compacted)
+        if cities is None:
+            city_dirs = sorted(glob.glob(os.path.join(day_dir, "city=*")))
+        else:
+            city_dirs = [os.path.join(day_dir, f"city={city_slug(c)}") for c in cities]
+        for city_dir in city_dirs:
+            files.extend(sorted(glob.glob(os.path.join(city_dir, "part-*.parquet"))))
+    return files
+
+def read_history(start=None, end=None, cities=None, columns=None, row_filter=None, root=HISTORY_DIR):
+    """
+    Forecast rows fetched between the `start` and `end` days (inclusive), for `cities`.
+    `row_filter` is an optional pyarrow expression, pushed down to the Parquet row groups.
+    """
+    files = partition_files(root, start, end, cities)
+    if not files:
+        return pd.DataFrame(columns=columns or [])
+    if cities is not None:
+        # Exact names: compacted days hold every city, and two names can share a slug
+        city_filter = ds.field("city").isin([str(c) for c in cities])
+        row_filter = city_filter if row_filter is None else row_filter & city_filter
+    dataset = ds.dataset(files, format="parquet")
+    df = dataset.to_table(columns=columns, filter=row_filter, use_threads=True).to_pandas()
+    return apply_schema(df, "weather")
+
+def forecasts_for(target_date, cities=None, columns=None, root=HISTORY_DIR):
+    """Every forecast issued for `target_date`, oldest fetch first (for forecast drift)."""
+    target_date = _as_date(target_date)
+    if columns is not None:
+        columns = list(dict.fromkeys(["city", "fetched_at", *columns]))
+    df = read_history(target_date - timedelta(days=FORECAST_DAYS), target_date, cities, columns,
+                      ds.field("target_date") == pa.scalar(target_date, pa.date32()), root)
+    return df.sort_values(["city", "fetched_at"], kind="stable").reset_index(drop=True) if len(df) else df
+
+def latest_forecasts(start=None, end=None, cities=None, columns=None, root=HISTORY_DIR):
+    """
+    The most recent forecast per city and target date, for target dates in [start, end]
+    (default: today and the following days).
+    """
+    start = _as_date(start) or datetime.now(timezone.utc).date()
+    end = _as_date(end) or start + timedelta(days=FORECAST_DAYS - 1)
+    if columns is not None:
+        columns = list(dict.fromkeys(["city", "target_date", "fetched_at", *columns]))
+    row_filter = (ds.field("target_date") >= pa.scalar(start, pa.date32())) & \
+                 (ds.field("target_date") <= pa.scalar(end, pa.date32()))
+    df = read_history(start - timedelta(days=FORECAST_DAYS), end, cities, columns, row_filter, root)
+    if df.empty:
+        return df
+    df = df.sort_values("fetched_at", kind="stable").drop_duplicates(["city", "target_date"], keep="last")
+    return df.sort_values(["city", "target_date"]).reset_index(drop=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query or maintain the forecast history")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Add the current weather dataset, stamped with its file time")
+    parser.add_argument("--for-date", help="Show every forecast issued for this day (YYYY-MM-DD)")
+    parser.add_argument("--latest", action="store_true", help="Show the latest forecast per city and day")
+    parser.add_argument("--city", nargs="*", help="Restrict queries to these cities")
+    parser.add_argument("--compact", nargs="*", metavar="FETCH_DATE",
+                        help="Merge the files of these fetch days (default: every finished day not merged yet)")
+    args = parser.parse_args()
+
+    if args.backfill:
+        path = dataset_path("weather") if os.path.exists(dataset_path("weather")) else dataset_path("weather", "csv")
+        fetched_at = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc).replace(tzinfo=None)
+        written = append(read_dataset("weather"), fetched_at)
+        print(f"🗃️ Backfilled {written} cities fetched at {fetched_at:%Y-%m-%d %H:%M} into {HISTORY_DIR}")
+    if args.compact is not None:
+        merged = {day: compact(day) for day in args.compact} if args.compact else compact_finished()
+        for day, n in merged.items():
+            print(f"🧱 {day}: merged {n} files")
+        print(f"✅ Compaction done, {sum(merged.values())} files merged")
+    if args.for_date:
+        df = forecasts_for(args.for_date, args.city)
+        print(f"📈 {len(df)} forecasts issued for {args.for_date}")
+        if len(df):
+            print(df[["city", "fetched_at", "day_offset", "temp_day", "rain", "humidity"]].to_string(index=False))
+    if args.latest:
+        df = latest_forecasts(cities=args.city)
+        print(f"🌤️ Latest forecast for {df['city'].nunique() if len(df) else 0} cities")
+        if len(df):
+            print(df[["city", "target_date", "fetched_at", "temp_day", "rain"]].to_string(index=False))
+    if not (args.backfill or args.compact is not None or args.for_date or args.latest):
+        days = fetch_dates()
+        print(f"🗃️ {len(days)} fetch days in {HISTORY_DIR}" + (f": {days[0]} .. {days[-1]}" if days else ""))
@@ -0,0 +1,164 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+import requests
+from dotenv import load_dotenv
+import instrumentation
+
+# --- CONFIGURATION ---
+# NOMINATIM_URL may come from .env (e.g. to point at stub_server.py), whoever imports this first
+load_dotenv()
+
+NOMINATIM_URL = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org/search")
+USER_AGENT = 'Jedha_Student_Project_Kayak'
+COUNTRY = "France"
+
+CACHE_PATH = "data/cache/geocode.sqlite"
+# City coordinates don't move, but Nominatim does fix its data from time to time
+DEFAULT_TTL_DAYS = 180
+
+def make_query(city):
+    """The exact string sent to Nominatim (adding the country avoids homonyms abroad)."""
+    return f"{city}, {COUNTRY}"
+
+def normalize_query(query):
+    """Cache key: case and whitespace differences must not cause a miss."""
+    return " ".join(query.strip().lower().split())
+
+def geocode_params(city):
+    return {
+        "q": make_query(city),
+        "format": "json",
+        "limit": 1
+    }
+
+class GeocodeCache:
+    """
+    On-disk (SQLite) cache of Nominatim answers, keyed by the normalized query string.
+    "Not found" answers are cached too, so a warm run makes zero geocoding calls.
+    """
+    def __init__(self, path=CACHE_PATH, ttl_days=DEFAULT_TTL_DAYS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.ttl = ttl_days * 86400 if ttl_days else None
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocode (
+                query TEXT PRIMARY KEY,
+                lat REAL,
+                lon REAL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, query):
+        """Returns (lat, lon) on a hit ((None, None) for a cached "not found"), None on a miss."""
+        key = normalize_query(query)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT lat, lon, fetched_at FROM geocode WHERE query = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl and time.time() - row[2] > self.ttl):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0], row[1]
+
+    def set(self, query, lat, lon):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO geocode (query, lat, lon, fetched_at) VALUES (?, ?, ?, ?)",
+                (normalize_query(query), lat, lon, time.time())
+            )
+            self.conn.commit()
+
+    def invalidate(self, query=None):
+        """Drops one query, or the whole cache when no query is given. Returns the number of rows removed."""
+        with self.lock:
+            if query is None:
+                cur = self.conn.execute("DELETE FROM geocode")
+            else:
+                cur = self.conn.execute("DELETE FROM geocode WHERE query = ?", (normalize_query(query),))
+            self.conn.commit()
+            return cur.rowcount
+
+    def purge_expired(self):
+        if not self.ttl:
+            return 0
+        with self.lock:
+            cur = self.conn.execute("DELETE FROM geocode WHERE fetched_at < ?", (time.time() - self.ttl,))
+            self.conn.commit()
+            return cur.rowcount
+
+    def report(self):
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0
+        print(f"🗂️ Geocode cache: {self.hits} hits / {self.misses} misses ({rate:.0f}% hit rate)")
+        instrumentation.gauge("geocode_cache_hits", self.hits)
+        instrumentation.gauge("geocode_cache_misses", self.misses)
+
+    def close(self):
+        self.conn.close()
+
+_default_cache = None
+
+def get_cache():
+    """Process-wide cache shared by every script that geocodes."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = GeocodeCache()
+    return _default_cache
+
+def fetch_coords(city):
+    """Raw Nominatim lookup, no cache. Raises on network errors."""
+    headers = {'User-Agent': USER_AGENT}
+    with instrumentation.request("nominatim") as call:
+        r = requests.get(NOMINATIM_URL, params=geocode_params(city), headers=headers)
+        call["status"] = r.status_code
+        data = r.json()
+    if data:
+        return float(data[0]['lat']), float(data[0]['lon'])
+    return None, None
+
+def geocode(city, cache=None, offline=False):
+    """
+    Cached geocoding. Returns (lat, lon), or (None, None) if the city is unknown.
+    With offline=True a cache miss returns (None, None) instead of calling Nominatim.
+    """
+    cache = cache or get_cache()
+    query = make_query(city)
+    cached = cache.get(query)
+    if cached is not None:
+        return cached
+    if offline:
+        return None, None
+
+    lat, lon = fetch_coords(city)
+    cache.set(query, lat, lon)
+    # Respect Nominatim Rate Limit (only real requests pay it)
+    time.sleep(1)
+    return lat, lon
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the geocode cache")
+    parser.add_argument("--invalidate", metavar="CITY", help="Forget one city")
+    parser.add_argument("--clear", action="store_true", help="Forget every city")
+    parser.add_argument("--purge-expired", action="store_true", help="Drop entries older than the TTL")
+    args = parser.parse_args()
+
+    cache = get_cache()
+    if args.invalidate:
+        print(f"🗑️ Removed {cache.invalidate(make_query(args.invalidate))} entry for {args.invalidate}")
+    if args.clear:
+        print(f"🗑️ Removed {cache.invalidate()} entries")
+    if args.purge_expired:
+        print(f"🗑️ Removed {cache.purge_expired()} expired entries")
+
+    count = cache.conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+    print(f"📊 {count} cached geocodes in {cache.path}")
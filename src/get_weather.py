@@ -1,8 +1,14 @@
 import pandas as pd
 import requests
+import asyncio
+import argparse
 import time
 import os
 from dotenv import load_dotenv
+from dataset_io import write_dataset
+import forecast_history
+from geocoding import NOMINATIM_URL, USER_AGENT, geocode, geocode_params, get_cache, make_query
+import instrumentation
 
 # 1. Load environment variables
 load_dotenv() 
@@ -12,54 +18,83 @@ API_KEY = os.getenv("OPENWEATHER_API_KEY")
 if not API_KEY:
     raise ValueError("❌ Error: OPENWEATHER_API_KEY not found. Check your .env file.")
 
+# Upstream endpoint (override it, and NOMINATIM_URL, to point the collector at stub_server.py)
+ONECALL_URL = os.getenv("ONECALL_URL", "https://api.openweathermap.org/data/3.0/onecall")
+
+# Async mode limits: Nominatim's usage policy is 1 req/s, OpenWeather can fan out
+NOMINATIM_CONCURRENCY = 1
+NOMINATIM_RATE = 1.0
+WEATHER_CONCURRENCY = 20
+WEATHER_RATE = 50.0
+
 # 2. Define the cities
 # Read cities from the master text file
 with open("data/cities.txt", "r", encoding="utf-8") as file:
     cities = [line.strip() for line in file if line.strip()]
 
-# 3. Helper: Geocoding
+# 3. Helper: Geocoding (cached on disk, see geocoding.py)
 def get_coords(city):
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {
-        "q": f"{city}, France",   # <--- adding France to avoid getting a city in another country
-        "format": "json", 
-        "limit": 1
-    }
-    headers = {'User-Agent': 'Jedha_Student_Project_Kayak'}
-    
     try:
-        r = requests.get(url, params=params, headers=headers)
-        data = r.json()
-        if data:
-            return float(data[0]['lat']), float(data[0]['lon'])
-        return None, None
+        return geocode(city)
     except Exception as e:
         print(f"⚠️ Error getting coords for {city}: {e}")
+        instrumentation.log("request_failed", upstream="nominatim", city=city, error=str(e))
         return None, None
 
 # 4. Helper: Weather (One Call API)
+def weather_params(lat, lon):
+    return {
+        "lat": lat,
+        "lon": lon,
+        "exclude": "minutely,hourly,alerts",
+        "units": "metric",
+        "appid": API_KEY
+    }
+
 def get_weather(lat, lon):
-    url = f"https://api.openweathermap.org/data/3.0/onecall?lat={lat}&lon={lon}&exclude=minutely,hourly,alerts&units=metric&appid={API_KEY}"
-    
     try:
-        r = requests.get(url)
-        data = r.json()
+        with instrumentation.request("onecall") as call:
+            r = requests.get(ONECALL_URL, params=weather_params(lat, lon))
+            call["status"] = r.status_code
+            data = r.json()
         
         # Check for API errors
         if r.status_code != 200:
             print(f"❌ API Error: {data.get('message', 'Unknown error')}")
+            instrumentation.log("api_error", upstream="onecall", status=r.status_code, message=data.get('message'))
             return None
 
         # Return the list of daily forecasts
         return data.get('daily', [])
     except Exception as e:
         print(f"⚠️ Error getting weather: {e}")
+        instrumentation.log("request_failed", upstream="onecall", error=str(e))
         return None
 
-# --- MAIN EXECUTION ---
-if __name__ == "__main__":
-    print("🚀 Starting Data Collection...")
-    
+# 5. Helper: Flatten a One Call response into CSV rows
+def forecast_rows(city, lat, lon, daily_forecasts):
+    rows = []
+    # We want the next 7 days (index 0 to 6)
+    for day_offset, day_data in enumerate(daily_forecasts[:7]):
+        rows.append({
+            "city": city,
+            "latitude": lat,
+            "longitude": lon,
+            "day_offset": day_offset, 
+            "date": pd.to_datetime(day_data['dt'], unit='s'),
+            "temp_day": day_data['temp']['day'],
+            "temp_min": day_data['temp']['min'],
+            "temp_max": day_data['temp']['max'],
+            "weather_main": day_data['weather'][0]['main'],
+            "weather_description": day_data['weather'][0]['description'],
+            "pop": day_data.get('pop', 0),    
+            "rain": day_data.get('rain', 0),  
+            "humidity": day_data.get('humidity', 0)
+        })
+    return rows
+
+def collect_weather():
+    """Sequential collector: one city at a time, blocking requests."""
     weather_data_list = []
 
     for city in cities:
@@ -69,45 +104,164 @@ if __name__ == "__main__":
         lat, lon = get_coords(city)
         if not lat:
             print(f"   ❌ Could not find coordinates for {city}")
+            instrumentation.count("cities_failed", reason="no_coords")
             continue
-            
-        # Respect Nominatim Rate Limit
-        time.sleep(1)
 
         # B. Get Weather
         daily_forecasts = get_weather(lat, lon)
         
         if daily_forecasts:
-            # We want the next 7 days (index 0 to 6)
-            for day_offset, day_data in enumerate(daily_forecasts[:7]):
-                weather_data_list.append({
-                    "city": city,
-                    "latitude": lat,
-                    "longitude": lon,
-                    "day_offset": day_offset, 
-                    "date": pd.to_datetime(day_data['dt'], unit='s'),
-                    "temp_day": day_data['temp']['day'],
-                    "temp_min": day_data['temp']['min'],
-                    "temp_max": day_data['temp']['max'],
-                    "weather_main": day_data['weather'][0]['main'],
-                    "weather_description": day_data['weather'][0]['description'],
-                    "pop": day_data.get('pop', 0),    
-                    "rain": day_data.get('rain', 0),  
-                    "humidity": day_data.get('humidity', 0)
-                })
+            weather_data_list.extend(forecast_rows(city, lat, lon, daily_forecasts))
         else:
             print(f"   ❌ No weather data for {city}")
+            instrumentation.count("cities_failed", reason="no_weather")
+
+    return weather_data_list
+
+# 6. Async mode: one shared keep-alive session, per-upstream limits
+class UpstreamLimiter:
+    """
+    Caps one upstream at `concurrency` requests in flight and `rate` requests per second.
+    Requests are spaced evenly (rate=1.0 means one start per second, never a burst).
+    """
+    def __init__(self, concurrency, rate):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = 1.0 / rate if rate else 0.0
+        self.lock = asyncio.Lock()
+        self.next_slot = 0.0
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        async with self.lock:
+            now = time.monotonic()
+            wait = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return self
 
-    # 5. Save to CSV
+    async def __aexit__(self, *exc):
+        self.semaphore.release()
+
+async def get_coords_async(session, limiter, city):
+    # Cache hits never touch the Nominatim limiter
+    cache = get_cache()
+    cached = cache.get(make_query(city))
+    if cached is not None:
+        return cached
+
+    try:
+        async with limiter:
+            with instrumentation.request("nominatim") as call:
+                async with session.get(NOMINATIM_URL, params=geocode_params(city)) as r:
+                    call["status"] = r.status
+                    data = await r.json(content_type=None)
+        lat, lon = (float(data[0]['lat']), float(data[0]['lon'])) if data else (None, None)
+        cache.set(make_query(city), lat, lon)
+        return lat, lon
+    except Exception as e:
+        print(f"⚠️ Error getting coords for {city}: {e}")
+        instrumentation.log("request_failed", upstream="nominatim", city=city, error=str(e))
+        return None, None
+
+async def get_weather_async(session, limiter, lat, lon):
+    try:
+        async with limiter:
+            with instrumentation.request("onecall") as call:
+                async with session.get(ONECALL_URL, params=weather_params(lat, lon)) as r:
+                    data = await r.json(content_type=None)
+                    status = call["status"] = r.status
+
+        # Check for API errors
+        if status != 200:
+            print(f"❌ API Error: {data.get('message', 'Unknown error')}")
+            instrumentation.log("api_error", upstream="onecall", status=status, message=data.get('message'))
+            return None
+
+        return data.get('daily', [])
+    except Exception as e:
+        print(f"⚠️ Error getting weather: {e}")
+        instrumentation.log("request_failed", upstream="onecall", error=str(e))
+        return None
+
+async def collect_city_async(session, geo_limiter, weather_limiter, city):
+    lat, lon = await get_coords_async(session, geo_limiter, city)
+    if not lat:
+        print(f"   ❌ Could not find coordinates for {city}")
+        instrumentation.count("cities_failed", reason="no_coords")
+        return []
+
+    daily_forecasts = await get_weather_async(session, weather_limiter, lat, lon)
+    if not daily_forecasts:
+        print(f"   ❌ No weather data for {city}")
+        instrumentation.count("cities_failed", reason="no_weather")
+        return []
+
+    print(f"Processed: {city}")
+    return forecast_rows(city, lat, lon, daily_forecasts)
+
+async def collect_weather_async(weather_concurrency=WEATHER_CONCURRENCY, weather_rate=WEATHER_RATE,
+                                geocode_rate=NOMINATIM_RATE):
+    """
+    Concurrent collector. Geocoding stays serialized at Nominatim's 1 req/s while
+    One Call requests for already-geocoded cities run in parallel behind it.
+    """
+    import aiohttp
+
+    geo_limiter = UpstreamLimiter(NOMINATIM_CONCURRENCY, geocode_rate)
+    weather_limiter = UpstreamLimiter(weather_concurrency, weather_rate)
+
+    connector = aiohttp.TCPConnector(limit=weather_concurrency + NOMINATIM_CONCURRENCY, keepalive_timeout=30)
+    timeout = aiohttp.ClientTimeout(total=30)
+    headers = {'User-Agent': USER_AGENT}
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+        tasks = [collect_city_async(session, geo_limiter, weather_limiter, city) for city in cities]
+        # gather() keeps the cities.txt order, so the CSV matches the sequential mode
+        results = await asyncio.gather(*tasks)
+
+    return [row for city_rows in results for row in city_rows]
+
+def save_weather(weather_data_list):
     if weather_data_list:
         df = pd.DataFrame(weather_data_list)
-        
-        # Ensure directory exists
-        os.makedirs("data/raw", exist_ok=True)
-        
-        output_path = "data/raw/weather_data.csv"
-        df.to_csv(output_path, index=False)
-        print(f"\n✅ Success! Weather data saved to: {output_path}")
+        output_path = write_dataset(df, "weather")
+        print(f"\n✅ Success! Weather data saved to: {output_path} (+ .csv)")
+        # The dataset above is overwritten by the next run; the history keeps every fetch
+        files = forecast_history.append(df)
+        compacted = forecast_history.compact_finished()
+        print(f"🗃️ Appended to the forecast history ({files} city partitions in {forecast_history.HISTORY_DIR}"
+              + (f", compacted {len(compacted)} finished days)" if compacted else ")"))
         print(f"📊 Total Rows: {len(df)}")
     else:
-        print("\n❌ Failed to collect any data.")
\ No newline at end of file
+        print("\n❌ Failed to collect any data.")
+
+# --- MAIN EXECUTION ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch geocodes and 7-day forecasts for data/cities.txt")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Collect concurrently with aiohttp instead of one city at a time")
+    parser.add_argument("--weather-concurrency", type=int, default=WEATHER_CONCURRENCY,
+                        help="Max One Call requests in flight (async mode)")
+    parser.add_argument("--weather-rate", type=float, default=WEATHER_RATE,
+                        help="Max One Call requests per second (async mode)")
+    parser.add_argument("--geocode-rate", type=float, default=NOMINATIM_RATE,
+                        help="Max Nominatim requests per second (async mode). Only raise this against stub_server.py")
+    instrumentation.add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with instrumentation.stage("weather", args.profile):
+        print("🚀 Starting Data Collection...")
+        start = time.perf_counter()
+
+        if args.use_async:
+            weather_data_list = asyncio.run(
+                collect_weather_async(args.weather_concurrency, args.weather_rate, args.geocode_rate)
+            )
+        else:
+            weather_data_list = collect_weather()
+
+        with instrumentation.timer("write"):
+            save_weather(weather_data_list)
+        get_cache().report()
+        print(f"⏱️ Collected {len(cities)} cities in {time.perf_counter() - start:.1f}s")
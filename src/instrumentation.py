@@ -0,0 +1,286 @@
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import threading
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS
+    resource = None
+
+# --- CONFIGURATION ---
+# One set of files per stage, overwritten by its next run (the .log.jsonl is appended to):
+#   <stage>.json        summary of the last run
+#   <stage>.prom        Prometheus textfile (point node_exporter's --collector.textfile.directory here)
+#   <stage>.log.jsonl   structured event log
+#   <stage>.prof/.svg   cProfile stats / py-spy flame graph, with --profile
+METRICS_DIR = os.getenv("KAYAK_METRICS_DIR", "data/metrics")
+# Upper bounds (s) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROFILERS = ("cprofile", "py-spy")
+# Functions listed after a cProfile run
+PROFILE_TOP = 20
+
+_lock = threading.Lock()
+_stage = {"name": None}
+_steps = {}      # step -> [count, wall, cpu, max wall]
+_requests = {}   # upstream -> {"buckets": [...], "count", "sum", "max"}
+_counters = {}   # (name, labels) -> value
+_gauges = {}     # (name, labels) -> value
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def peak_rss():
+    """(this process, its finished children) peak resident set size in bytes, or None."""
+    if resource is None:
+        return None, None
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit)
+
+# --- RECORDING ---
+@contextmanager
+def timer(step):
+    """
+    Times a sub-step (page load, parse, write...). Wall and CPU time are summed over calls and
+    threads; CPU is the calling thread's, so don't wrap code that awaits (use request() there).
+    """
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+        with _lock:
+            stats = _steps.setdefault(step, [0, 0.0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += wall
+            stats[2] += cpu
+            stats[3] = max(stats[3], wall)
+
+def observe(upstream, seconds):
+    with _lock:
+        hist = _requests.setdefault(upstream, {"buckets": [0] * len(LATENCY_BUCKETS), "count": 0, "sum": 0.0, "max": 0.0})
+        for b, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                hist["buckets"][b] += 1
+        hist["count"] += 1
+        hist["sum"] += seconds
+        hist["max"] = max(hist["max"], seconds)
+
+@contextmanager
+def request(upstream):
+    """
+    Times one call to an upstream service into its latency histogram. Set call["status"]
+    (HTTP code, "skipped"...) inside the block; an exception counts as status "error".
+    """
+    call = {"status": "ok"}
+    start = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        call["status"] = "error"
+        raise
+    finally:
+        observe(upstream, time.perf_counter() - start)
+        count("requests", upstream=upstream, status=call["status"])
+
+def count(name, n=1, **labels):
+    """Increments a counter (retries, errors, fallbacks...)."""
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+
+def gauge(name, value, **labels):
+    with _lock:
+        _gauges[(name, _labels(labels))] = value
+
+def log(event, **fields):
+    """Appends one structured event to the current stage's JSON log."""
+    record = {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+              "stage": _stage["name"], "pid": os.getpid(), "event": event, **fields}
+    line = json.dumps(record, default=str, ensure_ascii=False) + "\n"
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    with _lock:
+        with open(os.path.join(METRICS_DIR, f"{_stage['name'] or 'adhoc'}.log.jsonl"), "a", encoding="utf-8") as f:
+            f.write(line)
+
+# --- EXPORT ---
+def snapshot():
+    """Everything recorded so far, as plain data."""
+    with _lock:
+        steps = {name: {"count": c, "wall_seconds": round(w, 6), "cpu_seconds": round(cpu, 6),
+                        "max_seconds": round(m, 6)} for name, (c, w, cpu, m) in sorted(_steps.items())}
+        requests = {
+            upstream: {"count": h["count"], "sum_seconds": round(h["sum"], 6), "max_seconds": round(h["max"], 6),
+                       "mean_seconds": round(h["sum"] / h["count"], 6) if h["count"] else None,
+                       "buckets": dict(zip(map(str, LATENCY_BUCKETS), h["buckets"]))}
+            for upstream, h in sorted(_requests.items())
+        }
+        counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(_counters.items())]
+        gauges = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(_gauges.items())]
+    return {"steps": steps, "requests": requests, "counters": counters, "gauges": gauges}
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _series(name, labels, value):
+    inner = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+    return f"{name}{{{inner}}} {value}"
+
+def prometheus_text(summary):
+    stage = summary["stage"]
+    lines = []
+
+    def family(name, kind, help_text, samples):
+        if not samples:
+            return
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+
+    base = {"stage": stage}
+    family("kayak_stage_wall_seconds", "gauge", "Wall-clock duration of the last run.",
+           [_series("kayak_stage_wall_seconds", base, summary["wall_seconds"])])
+    family("kayak_stage_cpu_seconds", "gauge", "CPU time (all threads) of the last run.",
+           [_series("kayak_stage_cpu_seconds", base, summary["cpu_seconds"])])
+    family("kayak_stage_success", "gauge", "1 if the last run finished without an exception.",
+           [_series("kayak_stage_success", base, int(summary["status"] == "ok"))])
+    family("kayak_stage_last_run_timestamp_seconds", "gauge", "End of the last run (Unix time).",
+           [_series("kayak_stage_last_run_timestamp_seconds", base, summary["finished_ts"])])
+    if summary["peak_rss_bytes"] is not None:
+        family("kayak_stage_peak_rss_bytes", "gauge", "Peak resident set size of the process.",
+               [_series("kayak_stage_peak_rss_bytes", base, summary["peak_rss_bytes"]),
+                _series("kayak_stage_peak_rss_bytes", {**base, "process": "children"},
+                        summary["peak_rss_children_bytes"])])
+
+    steps = summary["steps"].items()
+    for metric, field, help_text in (
+        ("kayak_step_calls_total", "count", "Calls of each sub-step."),
+        ("kayak_step_wall_seconds_total", "wall_seconds", "Wall time in each sub-step, summed over threads."),
+        ("kayak_step_cpu_seconds_total", "cpu_seconds", "CPU time in each sub-step."),
+        ("kayak_step_max_seconds", "max_seconds", "Slowest single call of each sub-step.")
+    ):
+        kind = "gauge" if metric.endswith("max_seconds") else "counter"
+        family(metric, kind, help_text, [_series(metric, {**base, "step": s}, v[field]) for s, v in steps])
+
+    samples = []
+    for upstream, h in summary["requests"].items():
+        labels = {**base, "upstream": upstream}
+        for bound, n in h["buckets"].items():
+            samples.append(_series("kayak_request_seconds_bucket", {**labels, "le": bound}, n))
+        samples.append(_series("kayak_request_seconds_bucket", {**labels, "le": "+Inf"}, h["count"]))
+        samples.append(_series("kayak_request_seconds_sum", labels, h["sum_seconds"]))
+        samples.append(_series("kayak_request_seconds_count", labels, h["count"]))
+    family("kayak_request_seconds", "histogram", "Latency of calls to each upstream service.", samples)
+
+    family("kayak_events_total", "counter", "Counted events (requests, retries, errors, fallbacks...).",
+           [_series("kayak_events_total", {**base, "event": c["name"], **c["labels"]}, c["value"])
+            for c in summary["counters"]])
+    family("kayak_value", "gauge", "Values reported by the stage.",
+           [_series("kayak_value", {**base, "name": g["name"], **g["labels"]}, g["value"]) for g in summary["gauges"]])
+    return "\n".join(lines) + "\n"
+
+def _write_atomic(path, content):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def export(summary):
+    """Writes <stage>.json and <stage>.prom. Returns the .prom path."""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    base = os.path.join(METRICS_DIR, summary["stage"])
+    _write_atomic(base + ".json", json.dumps(summary, indent=2, default=str))
+    _write_atomic(base + ".prom", prometheus_text(summary))
+    return base + ".prom"
+
+# --- PROFILING ---
+def _start_profiler(profile, name):
+    if profile == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    if profile == "py-spy":
+        if shutil.which("py-spy") is None:
+            print("⚠️ --profile py-spy needs `py-spy` on the PATH (pip install py-spy), not profiling.")
+            return None
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        # Samples every thread and subprocess, unlike cProfile (main thread only)
+        return subprocess.Popen(["py-spy", "record", "--pid", str(os.getpid()), "--subprocesses",
+                                 "--output", os.path.join(METRICS_DIR, f"{name}.svg")],
+                                stdout=subprocess.DEVNULL)
+    return None
+
+def _stop_profiler(profiler, name):
+    if profiler is None:
+        return
+    if isinstance(profiler, subprocess.Popen):
+        profiler.send_signal(signal.SIGINT)  # py-spy writes the flame graph on SIGINT
+        profiler.wait(timeout=60)
+        print(f"🔥 Flame graph: {os.path.join(METRICS_DIR, name + '.svg')}")
+        return
+
+    import pstats
+    profiler.disable()
+    path = os.path.join(METRICS_DIR, f"{name}.prof")
+    profiler.dump_stats(path)
+    print(f"\n🔬 Top {PROFILE_TOP} functions by cumulative time (full stats: python -m pstats {path})")
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(PROFILE_TOP)
+
+# --- STAGE ---
+@contextmanager
+def stage(name, profile=None):
+    """
+    Instruments one script run: wall and CPU time, peak RSS, and every timer/request/count
+    recorded inside. Exports <stage>.json and <stage>.prom at the end, even on failure.
+    """
+    _stage["name"] = name
+    started_at = datetime.now(timezone.utc)
+    wall, cpu = time.perf_counter(), time.process_time()
+    log("stage_start", profile=profile)
+    profiler = _start_profiler(profile, name)
+    status = "ok"
+    try:
+        yield
+    except SystemExit as e:
+        status = "ok" if e.code in (None, 0) else "failed"
+        raise
+    except BaseException as e:
+        status = "failed"
+        log("stage_error", error=repr(e))
+        raise
+    finally:
+        _stop_profiler(profiler, name)
+        rss, rss_children = peak_rss()
+        finished_ts = time.time()
+        summary = {
+            "stage": name,
+            "status": status,
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "finished_ts": round(finished_ts, 3),
+            "wall_seconds": round(time.perf_counter() - wall, 6),
+            "cpu_seconds": round(time.process_time() - cpu, 6),
+            "peak_rss_bytes": rss,
+            "peak_rss_children_bytes": rss_children,
+            **snapshot()
+        }
+        prom_path = export(summary)
+        log("stage_end", status=status, wall_seconds=summary["wall_seconds"],
+            cpu_seconds=summary["cpu_seconds"], peak_rss_bytes=rss)
+        rss_text = f", peak RSS {rss / 1e6:.0f} MB" if rss is not None else ""
+        print(f"⏱️ {name}: {summary['wall_seconds']:.1f}s wall, {summary['cpu_seconds']:.1f}s CPU{rss_text} "
+              f"(metrics: {prom_path})")
+
+def add_profile_argument(parser):
+    """The --profile flag every instrumented script accepts (default from $KAYAK_PROFILE)."""
+    parser.add_argument("--profile", choices=PROFILERS, default=os.getenv("KAYAK_PROFILE") or None,
+                        help=f"Profile the run; output goes to {METRICS_DIR}/")
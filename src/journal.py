@@ -0,0 +1,90 @@
+import json
+import os
+import time
+
+# --- CONFIGURATION ---
+# fsync policies:
+#   "always"   -> fsync after every record (safest, slowest)
+#   "batch"    -> fsync every `fsync_every` records or `fsync_interval` seconds
+#   "never"    -> leave it to the OS (a power cut can lose the tail, a killed process can't)
+FSYNC_POLICIES = ("always", "batch", "never")
+
+class Journal:
+    """
+    Append-only JSONL checkpoint file: one record per line, never rewritten.
+    A crash can at worst leave a truncated last line, which replay() ignores.
+    """
+    def __init__(self, path, fsync="batch", fsync_every=10, fsync_interval=5.0):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.fsync = fsync
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.pending = 0
+        self.last_sync = time.monotonic()
+        self.file = None
+
+    def replay(self):
+        """Yields every complete record already in the journal, oldest first."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # Torn write from a killed process
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    break
+
+    def _truncate_torn_tail(self):
+        """Cuts a partial last line so new records don't get glued onto it."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def append(self, record):
+        if self.file is None:
+            self._truncate_torn_tail()
+            self.file = open(self.path, "a", encoding="utf-8")
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        self.pending += 1
+
+        if self.fsync == "always":
+            self.sync()
+        elif self.fsync == "batch" and (
+            self.pending >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval
+        ):
+            self.sync()
+
+    def sync(self):
+        if self.file is not None and self.pending:
+            os.fsync(self.file.fileno())
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        if self.file is not None:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+    def discard(self):
+        """Deletes the journal once its records have been compacted somewhere durable."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def atomic_write_csv(df, path):
+    """Writes to a temp file and renames it over `path`, so a kill never leaves a half-written CSV."""
+    tmp_path = path + ".tmp"
+    df.to_csv(tmp_path, index=False)
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
@@ -0,0 +1,199 @@
+import os
+import io
+import re
+import json
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+import pandas as pd
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from dotenv import load_dotenv
+from dataset_io import COMPRESSION, apply_schema, dataset_exists, read_dataset
+import instrumentation
+
+# --- CONFIGURATION ---
+load_dotenv()
+
+AWS_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY_ID")
+AWS_SECRET_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
+REGION = "eu-west-3" # Paris
+# Optional S3-compatible endpoint (MinIO, `moto_server`, ...) to run against the lake offline
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+
+# ⚠️ REPLACE THIS with your own unique bucket name!
+BUCKET_NAME = "dsfs-1-enavarr-project-kayak"
+
+# Partitioned layout, one folder per run date and city:
+#   lake/<dataset>/run_date=2026-02-19/city=collioure/part.parquet
+#   lake/<dataset>/run_date=2026-02-19/_manifest.json   (written last: a run is visible once complete)
+#   lake/<dataset>/_latest.json                          (points readers at the newest run)
+LAKE_PREFIX = "lake"
+# Datasets published per run (names from dataset_io)
+LAKE_DATASETS = ["master", "weather"]
+# Partitions uploaded / downloaded in parallel
+WORKERS = 8
+
+def get_client(max_connections=WORKERS):
+    return boto3.client(
+        "s3",
+        region_name=REGION,
+        endpoint_url=S3_ENDPOINT_URL,
+        aws_access_key_id=AWS_ACCESS_KEY,
+        aws_secret_access_key=AWS_SECRET_KEY,
+        config=Config(max_pool_connections=max_connections)
+    )
+
+def ensure_bucket(s3):
+    """Creates the bucket only when it does not exist yet."""
+    try:
+        s3.head_bucket(Bucket=BUCKET_NAME)
+        print(f"✅ Bucket '{BUCKET_NAME}' found.")
+        return
+    except ClientError as e:
+        if e.response["Error"]["Code"] not in ("404", "NoSuchBucket"):
+            raise
+
+    s3.create_bucket(
+        Bucket=BUCKET_NAME,
+        CreateBucketConfiguration={'LocationConstraint': REGION}
+    )
+    print(f"✅ Bucket '{BUCKET_NAME}' created.")
+
+def city_slug(city):
+    return re.sub(r"[^a-z0-9]+", "_", str(city).lower()).strip("_")
+
+def run_prefix(dataset, run_date):
+    return f"{LAKE_PREFIX}/{dataset}/run_date={run_date}"
+
+def manifest_key(dataset, run_date):
+    return f"{run_prefix(dataset, run_date)}/_manifest.json"
+
+def latest_key(dataset):
+    return f"{LAKE_PREFIX}/{dataset}/_latest.json"
+
+def _put_json(s3, key, payload):
+    s3.put_object(Bucket=BUCKET_NAME, Key=key, Body=json.dumps(payload, indent=2).encode("utf-8"),
+                  ContentType="application/json")
+
+def _get_json(s3, key):
+    return json.loads(s3.get_object(Bucket=BUCKET_NAME, Key=key)["Body"].read())
+
+# --- WRITER ---
+def _write_partition(s3, dataset, run_date, city, df):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False, compression=COMPRESSION)
+    body = buffer.getvalue()
+    key = f"{run_prefix(dataset, run_date)}/city={city_slug(city)}/part.parquet"
+    with instrumentation.request("s3"):
+        s3.put_object(Bucket=BUCKET_NAME, Key=key, Body=body)
+    return {
+        "city": str(city),
+        "key": key,
+        "rows": len(df),
+        "bytes": len(body),
+        "md5": hashlib.md5(body).hexdigest()
+    }
+
+def publish(s3, dataset, df, run_date=None, workers=WORKERS):
+    """
+    Writes `df` as one Parquet object per city under the run's date, then the run manifest
+    (objects, row counts, checksums) and finally the _latest pointer. Returns the manifest.
+    Re-publishing a date replaces that run.
+    """
+    run_date = run_date or datetime.now(timezone.utc).date().isoformat()
+    df = apply_schema(df.copy(), dataset)
+    groups = list(df.groupby("city", observed=True, sort=False))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        partitions = list(pool.map(lambda g: _write_partition(s3, dataset, run_date, *g), groups))
+
+    manifest = {
+        "dataset": dataset,
+        "run_date": run_date,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "rows": int(sum(p["rows"] for p in partitions)),
+        "columns": list(df.columns),
+        "partitions": partitions
+    }
+    _put_json(s3, manifest_key(dataset, run_date), manifest)
+    # Back-filling an older date must not move readers off the newest run
+    if max(list_runs(dataset, s3)) == run_date:
+        _put_json(s3, latest_key(dataset), {"run_date": run_date, "manifest": manifest_key(dataset, run_date)})
+    return manifest
+
+def publish_run(run_date=None, datasets=LAKE_DATASETS, workers=WORKERS):
+    """Publishes the local copy of every lake dataset as one run."""
+    print("🔌 Connecting to AWS S3...")
+    s3 = get_client(workers)
+    ensure_bucket(s3)
+    for dataset in datasets:
+        if not dataset_exists(dataset):
+            print(f"⚠️ {dataset}: no local dataset, not published")
+            continue
+        manifest = publish(s3, dataset, read_dataset(dataset), run_date, workers)
+        print(f"🗂️ {dataset}: {manifest['rows']} rows in {len(manifest['partitions'])} partitions "
+              f"-> s3://{BUCKET_NAME}/{run_prefix(dataset, manifest['run_date'])}/")
+
+# --- READER ---
+def list_runs(dataset, s3=None):
+    """Run dates with a complete manifest, oldest first."""
+    s3 = s3 or get_client()
+    prefix = f"{LAKE_PREFIX}/{dataset}/run_date="
+    runs = set()
+    for page in s3.get_paginator("list_objects_v2").paginate(Bucket=BUCKET_NAME, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            if obj["Key"].endswith("/_manifest.json"):
+                runs.add(obj["Key"][len(prefix):].split("/")[0])
+    return sorted(runs)
+
+def load_manifest(dataset, run_date=None, s3=None):
+    """The manifest of `run_date`, or of the latest run."""
+    s3 = s3 or get_client()
+    if run_date is None:
+        run_date = _get_json(s3, latest_key(dataset))["run_date"]
+    return _get_json(s3, manifest_key(dataset, run_date))
+
+def _read_partition(s3, partition, columns):
+    with instrumentation.request("s3"):
+        body = s3.get_object(Bucket=BUCKET_NAME, Key=partition["key"])["Body"].read()
+    if hashlib.md5(body).hexdigest() != partition["md5"]:
+        raise ValueError(f"Checksum mismatch for s3://{BUCKET_NAME}/{partition['key']}")
+    return pd.read_parquet(io.BytesIO(body), columns=columns)
+
+def read_lake(dataset, run_date=None, cities=None, columns=None, workers=WORKERS):
+    """
+    Loads a dataset from the lake, downloading only the partitions of `cities` (all when None)
+    concurrently, and only decoding `columns`. Rows come back in the run's partition order.
+    """
+    s3 = get_client(workers)
+    manifest = load_manifest(dataset, run_date, s3)
+    partitions = manifest["partitions"]
+    if cities is not None:
+        wanted = {str(city) for city in cities}
+        partitions = [p for p in partitions if p["city"] in wanted]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        frames = list(pool.map(lambda p: _read_partition(s3, p, columns), partitions))
+
+    if not frames:
+        return apply_schema(pd.DataFrame(columns=columns or manifest["columns"]), dataset)
+    # Per-partition categories differ; apply_schema rebuilds one categorical
+    df = pd.concat([f.astype({"city": str}) if "city" in f.columns else f for f in frames], ignore_index=True)
+    return apply_schema(df, dataset)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the partitioned S3 data lake")
+    parser.add_argument("dataset", choices=LAKE_DATASETS)
+    parser.add_argument("--run-date", help="Show this run instead of the latest one")
+    args = parser.parse_args()
+
+    runs = list_runs(args.dataset)
+    print(f"📅 {len(runs)} runs: {', '.join(runs) or '-'}")
+    if runs:
+        manifest = load_manifest(args.dataset, args.run_date)
+        print(f"🗂️ run {manifest['run_date']}: {manifest['rows']} rows, {len(manifest['partitions'])} partitions")
+        for p in manifest["partitions"]:
+            print(f"   {p['city']:<25} {p['rows']:>6} rows {p['bytes'] / 1e3:>8.1f} kB  {p['md5']}")
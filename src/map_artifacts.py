@@ -0,0 +1,26 @@
+import os
+import json
+
+# Where visualize_maps.py --build writes the pre-rendered maps. Kept free of pandas, Plotly
+# and database imports: dashboards import this module only to find the files to serve.
+
+# --- CONFIGURATION ---
+ARTIFACTS = {
+    "map1": "assets/map1/map1_destinations",
+    "map2": "assets/map2/map2_hotels"
+}
+BUILD_MANIFEST = "assets/maps.build.json"
+
+def load_build_manifest():
+    if not os.path.exists(BUILD_MANIFEST):
+        return {}
+    with open(BUILD_MANIFEST, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def cached_map(name="map1", fmt="html"):
+    """
+    Path of the last built artifact, for dashboards to serve as a file (None if never built).
+    No database query, pandas or Plotly involved.
+    """
+    path = load_build_manifest().get("artifacts", {}).get(name, {}).get(fmt)
+    return path if path and os.path.exists(path) else None
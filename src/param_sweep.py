@@ -0,0 +1,146 @@
+import argparse
+import itertools
+import time
+import numpy as np
+import pandas as pd
+import process_data as pdata
+from scoring import weather_score
+
+# --- CONFIGURATION ---
+# Parameter names accepted in a grid, with their production value from process_data.py
+PARAMS = {
+    "target_temp": pdata.TARGET_TEMP,
+    "hot_mult": pdata.HOT_PENALTY_MULT,
+    "cold_mult": pdata.COLD_PENALTY_MULT,
+    "rain_mult": pdata.RAIN_PENALTY_MULT,
+    "humid_mult": pdata.HUMID_PENALTY_MULT
+}
+TOP_K = 5
+# Upper bound on (parameter sets x forecast rows) evaluated in one NumPy pass (~8 bytes each)
+MAX_CELLS = 20_000_000
+
+def make_grid(**values):
+    """Cartesian product of parameter values; missing parameters keep their production value."""
+    unknown = set(values) - set(PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown parameters {sorted(unknown)}, expected some of {list(PARAMS)}")
+    axes = {name: list(values.get(name, [default])) for name, default in PARAMS.items()}
+    return pd.DataFrame(list(itertools.product(*axes.values())), columns=list(axes))
+
+def load_planning(path="data/raw/weather_data.csv"):
+    """The forecast rows process_data.py scores: day offsets 2 to 6."""
+    df = pd.read_csv(path)
+    return df[df['day_offset'] >= 2]
+
+def city_scores(df_planning, grid):
+    """
+    Mean daily weather score per (parameter set, city), as a (P, C) array, plus the city names.
+    All parameter sets are evaluated in one broadcasted pass (chunked to bound memory).
+    """
+    df_planning = df_planning.sort_values('city', kind='stable')
+    cities, starts = np.unique(df_planning['city'].to_numpy(), return_index=True)
+
+    temp = df_planning['temp_day'].to_numpy(dtype=float)[None, :]
+    rain = df_planning['rain'].to_numpy(dtype=float)[None, :]
+    humidity = df_planning['humidity'].to_numpy(dtype=float)[None, :]
+
+    params = {name: grid[name].to_numpy(dtype=float)[:, None] for name in PARAMS}
+    chunk = max(1, MAX_CELLS // max(1, temp.shape[1]))
+
+    scores = np.empty((len(grid), len(cities)))
+    for lo in range(0, len(grid), chunk):
+        hi = lo + chunk
+        daily = weather_score(
+            temp, rain, humidity,
+            params["target_temp"][lo:hi], params["hot_mult"][lo:hi], params["cold_mult"][lo:hi],
+            params["rain_mult"][lo:hi], params["humid_mult"][lo:hi]
+        )
+        # Rows are grouped by city, so a segmented sum gives every city's total at once.
+        # NaN days are left out of both sums, like the groupby mean in process_data.
+        valid = ~np.isnan(daily)
+        totals = np.add.reduceat(np.where(valid, daily, 0.0), starts, axis=1)
+        days = np.add.reduceat(valid, starts, axis=1)
+        scores[lo:hi] = np.where(days > 0, totals / np.maximum(days, 1), np.nan)
+    return scores, cities
+
+def sweep(df_planning, grid, top_k=TOP_K):
+    """
+    Ranks the cities under every parameter set of `grid`.
+
+    Returns a dict with:
+      scores     (P, C) mean weather score per parameter set and city
+      ranks      (P, C) 0-based rank of each city (0 = best; ties broken alphabetically, like process_data)
+      rankings   long DataFrame: param_set, rank, city, weather_score (top_k rows per set)
+      stability  per-city DataFrame: top-k frequency, mean/best/worst rank, baseline rank
+      spearman   (P,) rank correlation of each parameter set with the production ranking
+    """
+    grid = grid.reset_index(drop=True)
+    scores, cities = city_scores(df_planning, grid)
+    n_sets, n_cities = scores.shape
+
+    # Cities are sorted alphabetically, so a stable sort on -score keeps process_data's tie-break
+    order = np.argsort(-scores, axis=1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(n_cities)[None, :], axis=1)
+
+    baseline_scores, _ = city_scores(df_planning, make_grid())
+    baseline_order = np.argsort(-baseline_scores[0], kind='stable')
+    baseline_ranks = np.empty(n_cities, dtype=int)
+    baseline_ranks[baseline_order] = np.arange(n_cities)
+
+    d = ranks - baseline_ranks[None, :]
+    spearman = 1 - 6 * (d ** 2).sum(axis=1) / (n_cities * (n_cities ** 2 - 1)) if n_cities > 1 else np.ones(n_sets)
+
+    k = min(top_k, n_cities)
+    top = order[:, :k]
+    rankings = pd.DataFrame({
+        "param_set": np.repeat(np.arange(n_sets), k),
+        "rank": np.tile(np.arange(1, k + 1), n_sets),
+        "city": cities[top.ravel()],
+        "weather_score": np.take_along_axis(scores, top, axis=1).ravel()
+    })
+
+    stability = pd.DataFrame({
+        "city": cities,
+        f"top{k}_freq": (ranks < k).mean(axis=0),
+        "mean_rank": ranks.mean(axis=0) + 1,
+        "best_rank": ranks.min(axis=0) + 1,
+        "worst_rank": ranks.max(axis=0) + 1,
+        "baseline_rank": baseline_ranks + 1
+    }).sort_values([f"top{k}_freq", "mean_rank"], ascending=[False, True]).reset_index(drop=True)
+
+    return {
+        "scores": scores,
+        "ranks": ranks,
+        "cities": cities,
+        "rankings": rankings,
+        "stability": stability,
+        "spearman": spearman
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate many scoring-parameter sets in one vectorized pass")
+    for name, default in PARAMS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, nargs="+", default=[default],
+                            help=f"Values to try (default: {default})")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--output", help="Optional CSV path for the per-set top-k rankings")
+    args = parser.parse_args()
+
+    grid = make_grid(**{name: getattr(args, name) for name in PARAMS})
+    df_planning = load_planning()
+
+    print(f"🎛️ Sweeping {len(grid):,} parameter sets over {len(df_planning):,} forecast rows...")
+    start = time.perf_counter()
+    result = sweep(df_planning, grid, args.top_k)
+    print(f"⏱️ Done in {time.perf_counter() - start:.2f}s\n")
+
+    print(f"🏆 Rank stability across the grid (top {args.top_k}):")
+    print(result["stability"].head(15).to_string(index=False))
+    rho = result["spearman"]
+    print(f"\n📐 Spearman vs production ranking: min {rho.min():.3f} / median {np.median(rho):.3f} / max {rho.max():.3f}")
+
+    if args.output:
+        rankings = result["rankings"].merge(grid, left_on="param_set", right_index=True)
+        rankings.to_csv(args.output, index=False)
+        print(f"💾 Rankings saved to {args.output}")
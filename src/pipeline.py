@@ -0,0 +1,222 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataset_io import PATHS, dataset_path
+from instrumentation import METRICS_DIR, PROFILERS
+
+# --- CONFIGURATION ---
+# Each stage is one of the src/ scripts, run from the repo root like in the README.
+#   needs:    stages that must finish first (anything not linked runs concurrently)
+#   inputs:   files (or dataset_io dataset names) whose content feeds the fingerprint
+#   outputs:  files the stage must produce; a stage whose outputs vanished is re-run
+#   max_age:  hours before a stage that reads a live source (API, website) is considered stale
+STAGES = {
+    "weather": {
+        "script": "src/get_weather.py", "args": ["--async"], "needs": [],
+        "inputs": ["data/cities.txt"], "outputs": ["weather"], "max_age": 6
+    },
+    "scrape": {
+        "script": "src/scrape_booking.py", "args": [], "needs": [],
+        "inputs": ["data/cities.txt"], "outputs": ["booking"], "max_age": 24
+    },
+    "enrich": {
+        "script": "src/enrich_booking.py", "args": [], "needs": ["scrape"],
+        "inputs": ["booking"], "outputs": ["booking_enriched"]
+    },
+    "process": {
+        "script": "src/process_data.py", "args": [], "needs": ["weather", "enrich"],
+        "inputs": ["data/cities.txt", "weather", "booking_enriched"], "outputs": ["master"]
+    },
+    "upload": {
+        "script": "src/upload_s3.py", "args": [], "needs": ["process"],
+        "inputs": ["master", "weather"], "outputs": []
+    },
+    "load": {
+        "script": "src/etl_sql.py", "args": [], "needs": ["upload"],
+        "inputs": ["master", "weather"], "outputs": []
+    },
+    "maps": {
+        "script": "src/visualize_maps.py", "args": ["--build"], "needs": ["load"],
+        "inputs": ["master"], "outputs": ["assets/maps.build.json"]
+    }
+}
+
+# Fingerprints of the last successful run of each stage
+STATE_PATH = "data/cache/pipeline_state.json"
+# Stages running at the same time
+MAX_PARALLEL = 2
+
+def resolve(item):
+    """A dataset name becomes its Parquet file (or the CSV export if that is all there is)."""
+    if item in PATHS:
+        parquet, csv = dataset_path(item), dataset_path(item, "csv")
+        return parquet if os.path.exists(parquet) or not os.path.exists(csv) else csv
+    return item
+
+def code_files(script, seen=None):
+    """The script plus every src/ module it imports, recursively."""
+    seen = seen if seen is not None else set()
+    if script in seen or not os.path.exists(script):
+        return seen
+    seen.add(script)
+    with open(script, "r", encoding="utf-8") as f:
+        source = f.read()
+    for module in re.findall(r"^\s*(?:from|import)\s+(\w+)", source, re.MULTILINE):
+        code_files(os.path.join(os.path.dirname(script), f"{module}.py"), seen)
+    return seen
+
+def file_digest(path, h):
+    h.update(path.encode())
+    if not os.path.exists(path):
+        h.update(b"<missing>")
+        return
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+
+def fingerprint(name):
+    """Hash of the stage's input files, code and parameters."""
+    stage = STAGES[name]
+    h = hashlib.sha256(json.dumps({"script": stage["script"], "args": stage["args"]}).encode())
+    for path in sorted(resolve(i) for i in stage["inputs"]):
+        file_digest(path, h)
+    for path in sorted(code_files(stage["script"])):
+        file_digest(path, h)
+    return h.hexdigest()
+
+def load_state():
+    if not os.path.exists(STATE_PATH):
+        return {}
+    with open(STATE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    tmp_path = STATE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, STATE_PATH)
+
+def is_fresh(name, fp, state):
+    """True when the last successful run had the same fingerprint and is still usable."""
+    stage, last = STAGES[name], state.get(name)
+    if not last or last["fingerprint"] != fp:
+        return False
+    if not all(os.path.exists(resolve(o)) for o in stage["outputs"]):
+        return False
+    if stage.get("max_age") is not None:
+        age_hours = (time.time() - last["finished_at"]) / 3600
+        return age_hours < stage["max_age"]
+    return True
+
+def select_stages(start=None, until=None):
+    """Stage names between --from and --until, in declaration (topological) order."""
+    names = list(STAGES)
+    lo = names.index(start) if start else 0
+    hi = names.index(until) if until else len(names) - 1
+    return names[lo:hi + 1]
+
+def run_stage(name, lock):
+    """Runs one stage script, prefixing its output lines with the stage name. Returns (ok, seconds)."""
+    stage = STAGES[name]
+    cmd = [sys.executable, "-u", stage["script"]] + stage["args"]
+    start = time.perf_counter()
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               text=True, encoding="utf-8", errors="replace")
+    for line in process.stdout:
+        with lock:
+            print(f"[{name}] {line}", end="")
+    ok = process.wait() == 0
+    # Several scripts report errors and exit 0: a missing output also counts as a failure
+    missing = [resolve(o) for o in stage["outputs"] if not os.path.exists(resolve(o))]
+    if ok and missing:
+        with lock:
+            print(f"[{name}] ❌ expected output not produced: {', '.join(missing)}")
+        ok = False
+    return ok, time.perf_counter() - start
+
+def run_pipeline(start=None, until=None, force=False, dry_run=False, max_parallel=MAX_PARALLEL):
+    selected = select_stages(start, until)
+    state = load_state()
+    lock = threading.Lock()
+
+    # Stages outside the selection count as done: --from resumes after them
+    done, failed, skipped = set(STAGES) - set(selected), set(), []
+    pending = list(selected)
+    running = {}
+    print(f"🧭 Pipeline: {' -> '.join(selected)}" + (" (dry run)" if dry_run else ""))
+
+    with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+        while pending or running:
+            # Start every stage whose dependencies are satisfied
+            for name in list(pending):
+                needs = STAGES[name]["needs"]
+                if any(n in failed for n in needs):
+                    pending.remove(name)
+                    failed.add(name)
+                    print(f"⏭️ {name}: not run, an upstream stage failed")
+                    continue
+                if not all(n in done for n in needs):
+                    continue
+                pending.remove(name)
+                fp = fingerprint(name)
+                if not force and is_fresh(name, fp, state):
+                    print(f"✅ {name}: up to date, skipped")
+                    done.add(name)
+                    skipped.append(name)
+                    continue
+                if dry_run:
+                    print(f"▶️ {name}: would run {STAGES[name]['script']} {' '.join(STAGES[name]['args'])}")
+                    done.add(name)
+                    continue
+                print(f"▶️ {name}: starting")
+                running[pool.submit(run_stage, name, lock)] = (name, fp)
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, fp = running.pop(future)
+                ok, seconds = future.result()
+                if ok:
+                    done.add(name)
+                    # Fingerprint taken before the run: outputs written now are the next stage's inputs
+                    state[name] = {"fingerprint": fp, "finished_at": time.time(), "seconds": round(seconds, 2),
+                                   "finished": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+                    save_state(state)
+                    print(f"🎉 {name}: done in {seconds:.1f}s")
+                else:
+                    failed.add(name)
+                    print(f"❌ {name}: failed after {seconds:.1f}s")
+
+    if failed:
+        first = next(n for n in selected if n in failed)
+        print(f"\n❌ Pipeline failed at '{first}'. Resume with: python src/pipeline.py --from {first}")
+        return False
+    print(f"\n🏁 Pipeline complete ({len(skipped)} stage(s) skipped as up to date)")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the pipeline stages in dependency order, skipping up-to-date ones")
+    parser.add_argument("--from", dest="start", choices=STAGES, help="First stage to run (earlier ones count as done)")
+    parser.add_argument("--until", choices=STAGES, help="Last stage to run")
+    parser.add_argument("--force", action="store_true", help="Run the selected stages even if up to date")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would run")
+    parser.add_argument("--parallel", type=int, default=MAX_PARALLEL, help="Stages running at the same time")
+    parser.add_argument("--profile", choices=PROFILERS, help=f"Profile every stage run (output in {METRICS_DIR}/)")
+    args = parser.parse_args()
+
+    if args.profile:
+        # Inherited by the stage scripts as their --profile default
+        os.environ["KAYAK_PROFILE"] = args.profile
+
+    ok = run_pipeline(args.start, args.until, args.force, args.dry_run, args.parallel)
+    sys.exit(0 if ok else 1)
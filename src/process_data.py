@@ -1,5 +1,13 @@
 import pandas as pd
+import argparse
+import hashlib
+import json
 import os
+from dataset_io import dataset_path, read_dataset, write_dataset
+from geocoding import geocode, get_cache
+from scoring import climate_index, weather_score
+import spatial
+import instrumentation
 
 # ==========================================
 # 🎛️ SCORING PARAMETERS
@@ -11,11 +19,21 @@ RAIN_PENALTY_MULT = 5.0
 HUMID_PENALTY_MULT = 0.3
 # ==========================================
 
+# Only the forecast columns the scoring and aggregation need
+WEATHER_COLUMNS = ['city', 'latitude', 'longitude', 'day_offset', 'temp_day', 'rain', 'humidity']
+
+# Per-city content hashes of the last run, for incremental rebuilds.
+# Bump PROCESSING_VERSION whenever the merge/scoring logic changes, to force a full rebuild.
+MANIFEST_PATH = "data/processed/kayak_master.partitions.json"
+PROCESSING_VERSION = 1
+
 def load_cities():
     """Reads the master list of cities from the text file."""
     with open("data/cities.txt", "r", encoding="utf-8") as file:
         return [line.strip() for line in file if line.strip()]
 
+# Row-wise reference implementations. The pipeline uses the vectorized versions in
+# scoring.py, which tests/test_scoring.py checks against these two.
 def calculate_climate_index(row):
     """
     Drives the COLOR on the map. Purely based on Temperature.
@@ -52,35 +70,22 @@ def calculate_weather_score(row):
     
     return max(0, min(100, final_score))
 
-# ... [Keep the rest of your process_data_refined() function exactly the same] ...
-
-def process_data_refined():
-    print("🔄 Loading Raw Data...")
-    print("🚀 Starting Data Processing & Merging...")
-
-    # Load central source of truth for cities
-    CITIES = load_cities()
-    
-    # --- STEP 1: Load Data ---
-    try:
-        df_weather = pd.read_csv("data/raw/weather_data.csv")
-        df_hotels = pd.read_csv("data/processed/booking_data_enriched.csv")
-    except FileNotFoundError as e:
-        print(f"❌ Error: {e}")
-        return
-
-    # --- STEP 2: Process Weather Data ---
-    # "Exclude the first 2 days of data"
-    # day_offset starts at 0. So we keep offsets 2, 3, 4, 5, 6
-    print("📅 Filtering for Trip Planning (Days 3-7)...")
-    df_planning = df_weather[df_weather['day_offset'] >= 2].copy()
+def score_forecasts(df):
+    """Adds climate_index and daily_weather_score columns, computed column-wise."""
+    df['climate_index'] = climate_index(df['temp_day'], TARGET_TEMP, HOT_PENALTY_MULT, COLD_PENALTY_MULT)
+    df['daily_weather_score'] = weather_score(
+        df['temp_day'], df['rain'], df['humidity'],
+        TARGET_TEMP, HOT_PENALTY_MULT, COLD_PENALTY_MULT, RAIN_PENALTY_MULT, HUMID_PENALTY_MULT
+    )
+    return df
 
+def summarize_weather(df_planning):
+    """Per-city aggregates of the (already filtered) planning days."""
     # Calculate both the Index (Color) and the Score (Size)
-    df_planning['climate_index'] = df_planning.apply(calculate_climate_index, axis=1)
-    df_planning['daily_weather_score'] = df_planning.apply(calculate_weather_score, axis=1)
+    score_forecasts(df_planning)
 
     #print("🌤️ Aggregating Scores...")
-    weather_summary = df_planning.groupby("city").agg({
+    weather_summary = df_planning.groupby("city", observed=True).agg({
         "latitude": "first",    
         "longitude": "first",
         "temp_day": "mean",     
@@ -94,13 +99,24 @@ def process_data_refined():
         "rain": "total_rain_mm",
         "daily_weather_score": "weather_score"
     }, inplace=True)
+    return weather_summary
+
+def build_master(df_planning, df_hotels, city_id_map):
+    """Master rows (unsorted) for the hotels in df_hotels."""
+    weather_summary = summarize_weather(df_planning)
 
-    # --- STEP 3: Merge & Clean ---
-    print("🔗 Merging Hotel and Weather Data...")
-    city_id_map = {city: i+1 for i, city in enumerate(CITIES)}
-    
     df_master = pd.merge(df_hotels, weather_summary, on="city", how="left")
     df_master['city_id'] = df_master['city'].map(city_id_map)
+
+    # Cities with hotels but no forecast still get a centroid, from the geocode cache only (no network)
+    missing_coords = df_master['latitude'].isna()
+    if missing_coords.any():
+        for city in df_master.loc[missing_coords, 'city'].unique():
+            lat, lon = geocode(city, offline=True)
+            city_rows = missing_coords & (df_master['city'] == city)
+            df_master.loc[city_rows, 'latitude'] = lat
+            df_master.loc[city_rows, 'longitude'] = lon
+        get_cache().report()
     
     # Reorder
     cols = [
@@ -111,25 +127,132 @@ def process_data_refined():
     
     # Handle missing cols if hotel file has different structure
     existing_cols = [c for c in cols if c in df_master.columns]
-    df_master = df_master[existing_cols]
+    return df_master[existing_cols]
+
+def partition_hashes(df_planning, df_hotels, city_id_map):
+    """
+    One content hash per city, covering its forecast rows, its hotel rows, its city_id
+    and the scoring parameters. A city whose hash is unchanged has unchanged master rows.
+    """
+    params = repr((PROCESSING_VERSION, TARGET_TEMP, HOT_PENALTY_MULT, COLD_PENALTY_MULT,
+                   RAIN_PENALTY_MULT, HUMID_PENALTY_MULT)).encode()
+    hashes = {}
+    for name, df in (("weather", df_planning), ("hotels", df_hotels)):
+        # Vectorized per-row hashes, then one digest per city over its rows (in file order)
+        row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        for city, idx in df.groupby('city', observed=True, sort=False).indices.items():
+            if city not in hashes:
+                hashes[city] = hashlib.sha256(params + str(city_id_map.get(city)).encode())
+            hashes[city].update(name.encode())
+            hashes[city].update(row_hashes[idx].tobytes())
+    return {city: h.hexdigest() for city, h in hashes.items()}
+
+def master_signature():
+    """Size + mtime of the master Parquet, to detect a master written by something else."""
+    stat = os.stat(dataset_path("master"))
+    return [stat.st_size, stat.st_mtime_ns]
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("master_signature") == master_signature():
+            return manifest
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return None
+
+def process_data_refined(full=False):
+    print("🔄 Loading Raw Data...")
+    print("🚀 Starting Data Processing & Merging...")
+
+    # Load central source of truth for cities
+    CITIES = load_cities()
+    city_id_map = {city: i+1 for i, city in enumerate(CITIES)}
+    
+    # --- STEP 1: Load Data ---
+    try:
+        with instrumentation.timer("read"):
+            df_weather = read_dataset("weather", columns=WEATHER_COLUMNS)
+            df_hotels = read_dataset("booking_enriched")
+    except FileNotFoundError as e:
+        print(f"❌ Error: {e}")
+        return
+
+    # --- STEP 2: Process Weather Data ---
+    # "Exclude the first 2 days of data"
+    # day_offset starts at 0. So we keep offsets 2, 3, 4, 5, 6
+    print("📅 Filtering for Trip Planning (Days 3-7)...")
+    df_planning = df_weather[df_weather['day_offset'] >= 2].copy()
+
+    # --- STEP 3: Change detection ---
+    with instrumentation.timer("hash"):
+        hashes = partition_hashes(df_planning, df_hotels, city_id_map)
+    manifest = None if full else load_manifest()
+    if manifest:
+        previous = manifest["partitions"]
+        changed = {city for city, h in hashes.items() if previous.get(city) != h}
+        removed = set(previous) - set(hashes)
+    else:
+        changed, removed = set(hashes), set()
+    print(f"♻️ {len(hashes) - len(changed)} cities unchanged, {len(changed)} to rebuild, {len(removed)} removed")
+
+    if manifest and not changed and not removed:
+        print("✅ Master dataset already up to date.")
+        return
+
+    # --- STEP 4: Merge & Clean (affected cities only) ---
+    print("🔗 Merging Hotel and Weather Data...")
+    with instrumentation.timer("score_merge"):
+        df_master = build_master(
+            df_planning[df_planning['city'].isin(changed)],
+            df_hotels[df_hotels['city'].isin(changed)],
+            city_id_map
+        )
+    if manifest:
+        # Reuse the unchanged cities' rows from the previous master
+        df_previous = read_dataset("master")
+        df_previous = df_previous[~df_previous['city'].isin(changed | removed)]
+        df_master = pd.concat([df_previous, df_master], ignore_index=True)
+    df_master['city'] = df_master['city'].astype(str)
 
     # --- Sort the final dataset ---
     print("🧹 Sorting the final dataset by best weather and best hotels...")
     # 1. Best weather first (Descending)
     # 2. Alphabetical by city (Ascending)
     # 3. Best hotel score first (Descending)
-    df_master = df_master.sort_values(
-        by=['weather_score', 'city', 'score'], 
-        ascending=[False, True, False]
-    )
+    # 4. URL, so ties come out in the same order on full and incremental runs
+    with instrumentation.timer("sort"):
+        df_master = df_master.sort_values(
+            by=['weather_score', 'city', 'score', 'url'], 
+            ascending=[False, True, False, True]
+        )
+
+    # --- Sanity check: scraped hotel coordinates vs the searched city ---
+    with instrumentation.timer("spatial_check"):
+        checked = spatial.check_hotels(df_master)
+    misplaced = int(checked['misplaced'].sum())
+    if misplaced:
+        print(f"⚠️ {misplaced} hotels are more than {spatial.MISPLACED_KM:g} km from their city "
+              f"(details: python src/spatial.py)")
+    instrumentation.gauge("misplaced_hotels", misplaced)
 
-    # --- STEP 4: Save Output ---
-    os.makedirs("data/processed", exist_ok=True)
-    output_path = "data/processed/kayak_master.csv" # Overwrite the master
-    df_master.to_csv(output_path, index=False)
+    # --- STEP 5: Save Output ---
+    with instrumentation.timer("write"):
+        output_path = write_dataset(df_master, "master") # Overwrite the master (Parquet + CSV)
+        with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+            json.dump({"master_signature": master_signature(), "partitions": hashes}, f)
+    instrumentation.gauge("cities_rebuilt", len(changed))
+    instrumentation.gauge("master_rows", len(df_master))
     
     print(f"✅ Refined Master Dataset created: {output_path}")
     print(df_master[['city', 'weather_score', 'avg_temp', 'total_rain_mm']].drop_duplicates().head(10))
 
 if __name__ == "__main__":
-    process_data_refined()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Score the forecasts and merge them with the hotels")
+    parser.add_argument("--full", action="store_true", help="Ignore the change manifest and rebuild every city")
+    instrumentation.add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with instrumentation.stage("process", args.profile):
+        process_data_refined(full=args.full)
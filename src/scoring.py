@@ -0,0 +1,49 @@
+import numpy as np
+
+# Column-wise versions of calculate_climate_index() / calculate_weather_score() in process_data.py.
+# Parameters are passed explicitly so they can also be arrays (see the parameter sweep).
+#
+# Clamping uses np.where rather than np.clip on purpose: it reproduces Python's
+# max(0, min(100, x)) exactly, including for NaN inputs (min(100, nan) is 100),
+# so both implementations return bit-identical results.
+
+def _clamp_0_100(x):
+    capped = np.where(x < 100, x, 100.0)     # min(100, x)
+    return np.where(capped > 0, capped, 0.0)  # max(0, ...)
+
+def climate_index(temp, target_temp, hot_mult, cold_mult):
+    """
+    Drives the COLOR on the map. Purely based on Temperature.
+    0 = Extreme Cold (Blue), 50 = Perfect (Green), 100 = Extreme Hot (Red).
+    """
+    temp = np.asarray(temp, dtype=float)
+    index = np.where(
+        temp > target_temp,
+        50 + ((temp - target_temp) * hot_mult),
+        50 - ((target_temp - temp) * cold_mult)
+    )
+    return _clamp_0_100(index)
+
+def weather_score(temp, rain, humidity, target_temp, hot_mult, cold_mult, rain_mult, humid_mult):
+    """
+    Drives the SIZE on the map. Applies ALL penalties.
+    Uses a 2x multiplier for temperature to normalize against the 100-point scale.
+    """
+    temp = np.asarray(temp, dtype=float)
+    rain = np.asarray(rain, dtype=float)
+    humidity = np.asarray(humidity, dtype=float)
+
+    # 1. Temperature Penalty (Normalized 2x)
+    temp_penalty = np.where(
+        temp > target_temp,
+        (temp - target_temp) * 2 * hot_mult,
+        (target_temp - temp) * 2 * cold_mult
+    )
+
+    # 2. Rain & Humidity Penalties
+    rain_penalty = rain * rain_mult
+    humidity_penalty = (humidity - 60) * humid_mult
+    humidity_penalty = np.where(humidity_penalty > 0, humidity_penalty, 0.0)
+
+    # Final absolute score
+    return _clamp_0_100(100 - temp_penalty - rain_penalty - humidity_penalty)
@@ -1,56 +1,101 @@
 import time
+import argparse
+import threading
+import queue
 import re
+import os
+import glob
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlencode
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import InvalidSessionIdException
 from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
+from dataset_io import write_dataset
+from card_parsers import BACKENDS, DEFAULT_BACKEND, parse_cards
+from journal import atomic_write_csv
+from snapshots import SnapshotStore, load_snapshot
+import instrumentation
 
 # --- CONFIGURATION ---
 #  Read cities from the master text file to ensure ID consistency
 with open("data/cities.txt", "r", encoding="utf-8") as file:
     CITIES = [line.strip() for line in file if line.strip()]
 
-def init_driver():
+# Hotels kept per city (override with --per-city)
+MAX_HOTELS_PER_CITY = 20
+# Results pages visited per city (override with --pages); Booking pages by `offset`
+MAX_PAGES = 1
+RESULTS_PER_PAGE = 25
+# Number of parallel browsers (override with --workers)
+WORKERS = 3
+
+# One CSV per finished city, so a partial run is still usable
+CITY_DIR = "data/raw/booking_by_city"
+COLUMNS = ["city", "hotel_name", "url", "score", "description"]
+
+def init_driver(headless=True):
     options = webdriver.ChromeOptions()
-    options.add_argument("--start-maximized")
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1920,1080")
+    else:
+        options.add_argument("--start-maximized")
     options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
     service = Service(ChromeDriverManager().install())
     return webdriver.Chrome(service=service, options=options)
 
-def clean_score(text):
-    """Extracts the first number pattern X.X from text"""
-    if not text:
-        return "N/A"
-    # Search for pattern like 8.5 or 9.0
-    match = re.search(r'\d+[.,]\d+', text)
-    if match:
-        return match.group().replace(',', '.')
-    return text  # Return original if no number found
-
-def scrape_booking():
-    driver = init_driver()
-    all_hotels = []
-
+def accept_cookies(driver):
+    """Once per browser: the consent cookie then covers every city this worker scrapes."""
+    driver.get("https://www.booking.com/")
     try:
-        for city in CITIES:
-            print(f"🔎 Searching for hotels in: {city}...")
-            
-            # Filter for hotels, 2 adults
-            url = f"https://www.booking.com/searchresults.html?ss={city}&group_adults=2"
+        cookie_btn = WebDriverWait(driver, 3).until(
+            EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler"))
+        )
+        cookie_btn.click()
+    except:
+        pass
+
+def search_url(city, page=0):
+    # Filter for hotels, 2 adults
+    params = {"ss": city, "group_adults": 2}
+    if page:
+        params["offset"] = page * RESULTS_PER_PAGE
+    return "https://www.booking.com/searchresults.html?" + urlencode(params)
+
+def city_file(city):
+    slug = re.sub(r"[^a-z0-9]+", "_", city.lower()).strip("_")
+    return os.path.join(CITY_DIR, f"{slug}.csv")
+
+def parse_search_page(html, city, limit=MAX_HOTELS_PER_CITY, backend=DEFAULT_BACKEND):
+    """Returns (hotels, number of cards on the page) for one search-results page."""
+    return parse_cards(html, city, limit, backend)
+
+def merge_pages(pages, per_city):
+    """Concatenates a city's pages, dropping hotels already seen on an earlier page."""
+    hotels, seen = [], set()
+    for page_hotels in pages:
+        for hotel in page_hotels:
+            # Booking adds search-specific query params, the path identifies the hotel
+            key = hotel["url"].split("?")[0] if hotel["url"] else hotel["hotel_name"]
+            if key in seen:
+                continue
+            seen.add(key)
+            hotels.append(hotel)
+            if len(hotels) >= per_city:
+                return hotels
+    return hotels
+
+def scrape_city(driver, city, pages, per_city, backend, store):
+    page_results = []
+    for page in range(pages):
+        url = search_url(city, page)
+        with instrumentation.request("booking_search"), instrumentation.timer("page_load"):
             driver.get(url)
-            
-            # Handle Cookies
-            try:
-                cookie_btn = WebDriverWait(driver, 3).until(
-                    EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler"))
-                )
-                cookie_btn.click()
-            except:
-                pass 
 
             # Wait for hotel cards to definitely load
             try:
@@ -58,77 +103,190 @@ def scrape_booking():
                     EC.presence_of_element_located((By.XPATH, "//div[@data-testid='property-card']"))
                 )
             except:
-                print("   ⚠️ Timeout waiting for cards. Retrying...")
+                print(f"   ⚠️ {city} p{page + 1}: timeout waiting for cards. Retrying...")
+                instrumentation.count("timeouts", step="page_load")
                 time.sleep(2)
 
-            # Parse
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            cards = soup.find_all("div", {"data-testid": "property-card"})
-            
-            print(f"   🏠 Found {len(cards)} hotels. Scraping top 20...")
-
-            count = 0
-            for card in cards:
-                if count >= 20: break
-                
-                try:
-                    # 1. Name
-                    name_el = card.find("div", {"data-testid": "title"})
-                    name = name_el.get_text(strip=True) if name_el else "Unknown"
-                    
-                    # 2. URL
-                    link_el = card.find("a", {"data-testid": "title-link"})
-                    link = link_el['href'] if link_el else None
-                    
-                    # 3. Score (Try multiple selectors)
-                    score_el = card.find("div", {"data-testid": "review-score"})
-                    if score_el:
-                        raw_score = score_el.get_text(strip=True)
-                        score = clean_score(raw_score)
-                    else:
-                        score = "N/A"
-
-                    # 4. Description (Construct from available info)
-                    # Booking list view doesn't have a full "description", so we combine Address + Location Info
-                    address_el = card.find("span", {"data-testid": "address"})
-                    distance_el = card.find("span", {"data-testid": "distance"})
-                    
-                    parts = []
-                    if address_el: parts.append(address_el.get_text(strip=True))
-                    if distance_el: parts.append(distance_el.get_text(strip=True))
-                    
-                    description = " - ".join(parts) if parts else "No description available"
-
-                    all_hotels.append({
-                        "city": city,
-                        "hotel_name": name,
-                        "url": link,
-                        "score": score,
-                        "description": description
-                    })
-                    count += 1
-                except Exception as e:
-                    print(f"   ⚠️ Error parsing card: {e}")
+        # Archive the raw page, then parse it
+        html = driver.page_source
+        with instrumentation.timer("snapshot"):
+            store.save("search", url, html, city=city, page=page)
+        with instrumentation.timer("parse"):
+            hotels, n_cards = parse_search_page(html, city, limit=RESULTS_PER_PAGE, backend=backend)
+        page_results.append(hotels)
+
+        # Stop at the last results page or once we have enough hotels
+        if n_cards < RESULTS_PER_PAGE or len(merge_pages(page_results, per_city)) >= per_city:
+            break
+
+        # Polite wait
+        time.sleep(1)
+
+    return merge_pages(page_results, per_city)
+
+def city_done(city):
+    """True when the city's file exists and holds at least one hotel (header + a row)."""
+    path = city_file(city)
+    if not os.path.exists(path):
+        return False
+    with open(path, "r", encoding="utf-8") as f:
+        return sum(1 for _ in zip(range(2), f)) > 1
+
+def save_city(city, hotels):
+    os.makedirs(CITY_DIR, exist_ok=True)
+    atomic_write_csv(pd.DataFrame(hotels, columns=COLUMNS), city_file(city))
+
+def city_worker(worker_id, city_queue, options, store):
+    """Owns one browser and scrapes cities from the shared queue until it is empty."""
+    driver = init_driver(options["headless"])
+    accept_cookies(driver)
+    try:
+        while True:
+            try:
+                city, attempt = city_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            try:
+                hotels = scrape_city(driver, city, options["pages"], options["per_city"], options["backend"], store)
+                if not hotels:
+                    # No file: --resume retries the city instead of taking it as done
+                    print(f"   ⚠️ [worker {worker_id}] {city}: no hotel cards found, not saved")
+                    instrumentation.count("errors", kind="no_cards")
+                    instrumentation.log("city_empty", worker=worker_id, city=city)
                     continue
-            
-            # Polite wait
-            time.sleep(1)
+                with instrumentation.timer("write"):
+                    save_city(city, hotels)
+                print(f"🏠 [worker {worker_id}] {city}: {len(hotels)} hotels")
+
+            except InvalidSessionIdException:
+                print(f"   🔄 Worker {worker_id}: browser crashed on {city}! Restarting Chrome...")
+                instrumentation.count("browser_restarts")
+                instrumentation.log("browser_crash", worker=worker_id, city=city, attempt=attempt)
+                try: driver.quit()
+                except: pass
+                driver = init_driver(options["headless"])
+                accept_cookies(driver)
+                if attempt == 0:
+                    instrumentation.count("retries", upstream="booking_search")
+                    city_queue.put((city, 1))
+                else:
+                    print(f"   ❌ [worker {worker_id}] {city}: dropped after a second browser crash")
+                    instrumentation.count("errors", kind="browser_crash")
+                    instrumentation.log("city_dropped", worker=worker_id, city=city)
 
-    except Exception as e:
-        print(f"❌ Critical Error: {e}")
+            except Exception as e:
+                print(f"   ❌ [worker {worker_id}] {city}: {e}")
+                instrumentation.count("errors", kind=type(e).__name__)
+                instrumentation.log("city_failed", worker=worker_id, city=city, error=str(e))
     finally:
-        driver.quit()
+        try: driver.quit()
+        except: pass
 
-    # Save
+def save_hotels(all_hotels):
     if all_hotels:
-        df = pd.DataFrame(all_hotels)
-        output_path = "data/raw/booking_data.csv"
-        df.to_csv(output_path, index=False)
-        print(f"\n✅ Scraping Complete! Saved {len(df)} hotels to {output_path}")
+        df = pd.DataFrame(all_hotels, columns=COLUMNS)
+        output_path = write_dataset(df, "booking")
+        print(f"\n✅ Scraping Complete! Saved {len(df)} hotels to {output_path} (+ .csv)")
         print("Sample Data:")
         print(df[['hotel_name', 'score', 'description']].head())
     else:
         print("❌ No data scraped.")
 
+def combine_city_files():
+    """Builds the booking dataset from the per-city files, in cities.txt order."""
+    frames = [pd.read_csv(city_file(city), dtype=str) for city in CITIES if os.path.exists(city_file(city))]
+    missing = sum(not city_done(city) for city in CITIES)
+    if missing:
+        print(f"⚠️ {missing} cities have no output yet (re-run with --resume to fill them in)")
+    save_hotels(pd.concat(frames).to_dict("records") if frames else [])
+
+def scrape_booking(backend=DEFAULT_BACKEND, pages=MAX_PAGES, per_city=MAX_HOTELS_PER_CITY,
+                   workers=WORKERS, headless=True, resume=False):
+    os.makedirs(CITY_DIR, exist_ok=True)
+    if not resume:
+        for path in glob.glob(os.path.join(CITY_DIR, "*.csv")):
+            os.remove(path)
+
+    city_queue = queue.Queue()
+    for city in CITIES:
+        if resume and city_done(city):
+            continue
+        city_queue.put((city, 0))
+
+    todo = city_queue.qsize()
+    workers = max(1, min(workers, todo))
+    print(f"🔎 Searching {todo} cities with {workers} browser(s), up to {pages} page(s) / {per_city} hotels each...")
+
+    store = SnapshotStore()
+    options = {"pages": pages, "per_city": per_city, "backend": backend, "headless": headless}
+    threads = [
+        threading.Thread(target=city_worker, args=(w + 1, city_queue, options, store), daemon=True)
+        for w in range(workers)
+    ] if todo else []
+
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    except KeyboardInterrupt:
+        print("⛔ Interrupted, keeping the cities finished so far.")
+    finally:
+        store.close()
+
+    # Save
+    combine_city_files()
+
+def parse_snapshot(job):
+    root, entry, backend = job
+    hotels, n_cards = parse_search_page(load_snapshot(root, entry), entry["city"], limit=RESULTS_PER_PAGE, backend=backend)
+    return entry["city"], entry.get("page", 0), hotels
+
+def scrape_from_snapshots(processes=None, backend=DEFAULT_BACKEND, pages=MAX_PAGES, per_city=MAX_HOTELS_PER_CITY):
+    """Re-runs the card extraction over archived search pages, one CPU core per process."""
+    store = SnapshotStore()
+    city_order = {city: i for i, city in enumerate(CITIES)}
+    entries = [
+        e for e in store.latest("search")
+        if e["city"] in city_order and e.get("page", 0) < pages
+    ]
+    print(f"🗄️ Re-parsing {len(entries)} archived search pages...")
+
+    with ProcessPoolExecutor(max_workers=processes) as pool, instrumentation.timer("parse"):
+        results = list(pool.map(parse_snapshot, [(store.root, e, backend) for e in entries], chunksize=8))
+
+    # Reassemble each city's pages in order
+    results.sort(key=lambda r: (city_order[r[0]], r[1]))
+    by_city = {}
+    for city, _, hotels in results:
+        by_city.setdefault(city, []).append(hotels)
+
+    all_hotels = []
+    with instrumentation.timer("write"):
+        for city, city_pages in by_city.items():
+            hotels = merge_pages(city_pages, per_city)
+            save_city(city, hotels)
+            all_hotels.extend(hotels)
+
+        save_hotels(all_hotels)
+
 if __name__ == "__main__":
-    scrape_booking()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Scrape the base hotel list from Booking.com search pages")
+    parser.add_argument("--from-snapshots", action="store_true",
+                        help="Re-extract from data/snapshots instead of browsing (no network)")
+    parser.add_argument("--processes", type=int, default=None, help="Parser processes for --from-snapshots")
+    parser.add_argument("--parser", choices=BACKENDS, default=DEFAULT_BACKEND, help="HTML parser backend for result cards")
+    parser.add_argument("--pages", type=int, default=MAX_PAGES, help=f"Results pages per city ({RESULTS_PER_PAGE} hotels each)")
+    parser.add_argument("--per-city", type=int, default=MAX_HOTELS_PER_CITY, help="Max hotels kept per city")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Number of parallel browsers")
+    parser.add_argument("--show-browser", action="store_true", help="Run Chrome with a visible window")
+    parser.add_argument("--resume", action="store_true", help=f"Skip cities already saved in {CITY_DIR}")
+    instrumentation.add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with instrumentation.stage("scrape", args.profile):
+        if args.from_snapshots:
+            scrape_from_snapshots(args.processes, args.parser, args.pages, args.per_city)
+        else:
+            scrape_booking(args.parser, args.pages, args.per_city, args.workers, not args.show_browser, args.resume)
@@ -0,0 +1,96 @@
+import gzip
+import hashlib
+import os
+import threading
+import time
+from journal import Journal
+
+try:
+    import zstandard
+except ImportError:  # gzip is always available, zstd is just faster and smaller
+    zstandard = None
+
+# --- CONFIGURATION ---
+SNAPSHOT_DIR = "data/snapshots"
+# Blobs are stored once per distinct content: objects/<sha[:2]>/<sha>.html.<ext>
+# Every fetch (even of identical content) gets a line in index.jsonl
+INDEX_NAME = "index.jsonl"
+
+def url_hash(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+def content_hash(html):
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+def _compress(data):
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=10).compress(data), "zst"
+    return gzip.compress(data, compresslevel=6), "gz"
+
+def _decompress(data, ext):
+    if ext == "zst":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+class SnapshotStore:
+    """
+    Compressed, content-addressed archive of raw HTML pages.
+    Lets the extraction code be re-run offline over everything we ever fetched.
+    """
+    def __init__(self, root=SNAPSHOT_DIR):
+        self.root = root
+        self.lock = threading.Lock()
+        self.index = Journal(os.path.join(root, INDEX_NAME), fsync="never")
+
+    def _blob_path(self, sha, ext):
+        return os.path.join(self.root, "objects", sha[:2], f"{sha}.html.{ext}")
+
+    def save(self, kind, url, html, **meta):
+        """Archives one fetched page. `kind` is "search" or "detail"; meta is stored in the index."""
+        sha = content_hash(html)
+        with self.lock:
+            existing = [p for p in (self._blob_path(sha, "zst"), self._blob_path(sha, "gz")) if os.path.exists(p)]
+            if existing:
+                path = existing[0]
+            else:
+                blob, ext = _compress(html.encode("utf-8"))
+                path = self._blob_path(sha, ext)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(blob)
+                os.replace(tmp_path, path)
+
+            self.index.append({
+                "kind": kind,
+                "url": url,
+                "url_hash": url_hash(url),
+                "fetched_at": time.time(),
+                "sha": sha,
+                "path": os.path.relpath(path, self.root),
+                **meta
+            })
+
+    def entries(self, kind=None):
+        for entry in self.index.replay():
+            if kind is None or entry["kind"] == kind:
+                yield entry
+
+    def latest(self, kind, key="url_hash"):
+        """Most recent snapshot per `key` (per URL by default), in first-seen order."""
+        latest = {}
+        for entry in self.entries(kind):
+            k = entry.get(key)
+            if k not in latest or entry["fetched_at"] >= latest[k]["fetched_at"]:
+                latest[k] = entry
+        return list(latest.values())
+
+    def close(self):
+        self.index.close()
+
+def load_snapshot(root, entry):
+    """Module-level (picklable) so process pools can read snapshots themselves."""
+    path = os.path.join(root, entry["path"])
+    with open(path, "rb") as f:
+        data = f.read()
+    return _decompress(data, path.rsplit(".", 1)[-1]).decode("utf-8")
@@ -0,0 +1,204 @@
+import argparse
+import numpy as np
+import pandas as pd
+from dataset_io import read_dataset
+
+# --- CONFIGURATION ---
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG = np.pi * EARTH_RADIUS_KM / 180
+# A scraped hotel further than this from the city it was searched for is flagged as misplaced
+MISPLACED_KM = 25.0
+# Grid cell size of GridIndex, in degrees (~55 km of latitude)
+CELL_DEG = 0.5
+# Hotels without usable coordinates are drawn within +/- this many degrees of the centroid
+FALLBACK_SPREAD_DEG = 0.015
+# Rows per block in nearest(): the distance block is CHUNK_ROWS x reference points
+CHUNK_ROWS = 8192
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km, element-wise (arrays broadcast, NaN in gives NaN out)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=float)) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def _unit_vectors(lat, lon):
+    lat, lon = np.radians(np.asarray(lat, dtype=float)), np.radians(np.asarray(lon, dtype=float))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+def nearest(lat, lon, ref_lat, ref_lon, chunk_rows=CHUNK_ROWS):
+    """
+    Index of the closest reference point (e.g. a city centroid) for every point, and its
+    distance in km. Closest on the sphere = largest dot product of the unit vectors, so each
+    block is one matrix product. Points without coordinates get index -1 and a NaN distance.
+    """
+    lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+    ref = _unit_vectors(ref_lat, ref_lon)
+    idx = np.full(len(lat), -1, dtype=np.int64)
+    valid = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+    if len(ref) and len(valid):
+        points = _unit_vectors(lat[valid], lon[valid])
+        for start in range(0, len(points), chunk_rows):
+            block = points[start:start + chunk_rows] @ ref.T
+            idx[valid[start:start + chunk_rows]] = block.argmax(axis=1)
+    dist = np.full(len(lat), np.nan)
+    found = idx >= 0
+    dist[found] = haversine_km(lat[found], lon[found],
+                               np.asarray(ref_lat, dtype=float)[idx[found]],
+                               np.asarray(ref_lon, dtype=float)[idx[found]])
+    return idx, dist
+
+class GridIndex:
+    """
+    Points bucketed into CELL_DEG x CELL_DEG cells and sorted by cell, so a radius query
+    only computes distances for the cells overlapping the query's bounding box.
+    """
+
+    def __init__(self, lat, lon, cell_deg=CELL_DEG):
+        lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+        self.cell_deg = cell_deg
+        self.n_cols = int(np.ceil(360 / cell_deg)) + 1
+        valid = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+        keys = self._row(lat[valid]) * self.n_cols + self._col(lon[valid])
+        order = np.argsort(keys, kind="stable")
+        # Positions in the input arrays, and the sorted keys/coordinates
+        self.ids = valid[order]
+        self.keys = keys[order]
+        self.lat = lat[self.ids]
+        self.lon = lon[self.ids]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _row(self, lat):
+        return np.floor((np.asarray(lat) + 90) / self.cell_deg).astype(np.int64)
+
+    def _col(self, lon):
+        return np.floor((np.asarray(lon) + 180) / self.cell_deg).astype(np.int64)
+
+    def within(self, lat, lon, radius_km):
+        """(positions, distances in km) of the points within radius_km of (lat, lon), nearest first."""
+        dlat = radius_km / KM_PER_DEG
+        cos_lat = np.cos(np.radians(min(abs(lat) + dlat, 90.0)))
+        dlon = radius_km / (KM_PER_DEG * cos_lat) if cos_lat > 1e-9 else 360.0
+        rows = np.arange(self._row(max(lat - dlat, -90.0)), self._row(min(lat + dlat, 90.0)) + 1)
+        if dlon >= 180 or lon - dlon < -180 or lon + dlon > 180:
+            # Polar cap or antimeridian: scan the whole latitude band
+            col_lo, col_hi = 0, self.n_cols - 1
+        else:
+            col_lo, col_hi = self._col(lon - dlon), self._col(lon + dlon)
+
+        # One contiguous slice of the sorted keys per grid row
+        lo = np.searchsorted(self.keys, rows * self.n_cols + col_lo, side="left")
+        hi = np.searchsorted(self.keys, rows * self.n_cols + col_hi, side="right")
+        lengths = hi - lo
+        candidates = np.repeat(lo - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+        dist = haversine_km(lat, lon, self.lat[candidates], self.lon[candidates])
+        keep = dist <= radius_km
+        candidates, dist = candidates[keep], dist[keep]
+        order = np.argsort(dist, kind="stable")
+        return self.ids[candidates[order]], dist[order]
+
+def city_centroids(df):
+    """One (city, latitude, longitude) row per city, from master-shaped rows."""
+    return (df[["city", "latitude", "longitude"]].dropna()
+            .drop_duplicates("city").reset_index(drop=True))
+
+def check_hotels(df, centroids=None, max_km=MISPLACED_KM):
+    """
+    Adds, per hotel: distance_km (scraped coordinates to the searched city's centroid),
+    nearest_city / nearest_km (closest centroid), and misplaced (further than max_km from
+    the searched city). Hotels without scraped coordinates are never misplaced.
+    `df` needs city, hotel_lat, hotel_lon, plus latitude/longitude when `centroids` is None.
+    """
+    centroids = city_centroids(df) if centroids is None else centroids
+    df = df.copy()
+    city_pos = pd.Index(centroids["city"]).get_indexer(df["city"].astype(str))
+    known = city_pos >= 0
+    city_lat = np.where(known, centroids["latitude"].to_numpy(dtype=float)[city_pos], np.nan)
+    city_lon = np.where(known, centroids["longitude"].to_numpy(dtype=float)[city_pos], np.nan)
+
+    df["distance_km"] = haversine_km(df["hotel_lat"], df["hotel_lon"], city_lat, city_lon)
+    idx, dist = nearest(df["hotel_lat"], df["hotel_lon"], centroids["latitude"], centroids["longitude"])
+    df["nearest_city"] = np.where(idx >= 0, centroids["city"].to_numpy(dtype=object)[idx], None)
+    df["nearest_km"] = dist
+    df["misplaced"] = df["distance_km"].to_numpy() > max_km
+    return df
+
+def reassign(checked, max_km=MISPLACED_KM):
+    """
+    City per hotel after reassignment: a misplaced hotel moves to its nearest city when it
+    lies within max_km of it, otherwise (and for every other hotel) the city is unchanged.
+    """
+    move = checked["misplaced"] & (checked["nearest_km"] <= max_km)
+    return checked["city"].astype(str).where(~move, checked["nearest_city"])
+
+def hotels_within(df, centers, radius_km, index=None):
+    """
+    Hotels with scraped coordinates within radius_km of each center (rows with city,
+    latitude, longitude), nearest first. Returns the hotel rows plus near_city and distance_km;
+    a hotel close to several centers appears once per center. Pass `index` (a GridIndex over
+    df's hotel_lat/hotel_lon) to reuse it across calls.
+    """
+    index = index if index is not None else GridIndex(df["hotel_lat"], df["hotel_lon"])
+    parts = []
+    for center in centers[["city", "latitude", "longitude"]].itertuples(index=False):
+        ids, dist = index.within(center.latitude, center.longitude, radius_km)
+        part = df.iloc[ids].copy()
+        part["near_city"] = center.city
+        part["distance_km"] = dist
+        parts.append(part)
+    if not parts:
+        return df.iloc[:0].assign(near_city=pd.Series(dtype=object), distance_km=pd.Series(dtype=float))
+    return pd.concat(parts, ignore_index=True)
+
+def map_coordinates(df, max_km=None, spread_deg=FALLBACK_SPREAD_DEG):
+    """
+    (lat, lon) arrays to draw each hotel at: the scraped coordinates when there are some
+    (and, with max_km, when they are within max_km of the city centroid), otherwise a point
+    near the centroid. The offset comes from a hash of the city and hotel name, so a hotel
+    lands on the same spot on every build.
+    """
+    hotel_lat = df["hotel_lat"].to_numpy(dtype=float)
+    hotel_lon = df["hotel_lon"].to_numpy(dtype=float)
+    city_lat = df["latitude"].to_numpy(dtype=float)
+    city_lon = df["longitude"].to_numpy(dtype=float)
+    usable = ~(np.isnan(hotel_lat) | np.isnan(hotel_lon))
+    if max_km is not None:
+        usable &= haversine_km(hotel_lat, hotel_lon, city_lat, city_lon) <= max_km
+
+    h = pd.util.hash_pandas_object(df[["city", "hotel_name"]].astype(str), index=False).to_numpy()
+    u_lat = (h & 0xFFFFFFFF) / 2**32
+    u_lon = (h >> np.uint64(32)) / 2**32
+    fallback_lat = city_lat + (2 * u_lat - 1) * spread_deg
+    fallback_lon = city_lon + (2 * u_lon - 1) * spread_deg
+    return np.where(usable, hotel_lat, fallback_lat), np.where(usable, hotel_lon, fallback_lon)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check scraped hotel coordinates against their cities")
+    parser.add_argument("--max-km", type=float, default=MISPLACED_KM,
+                        help="Distance from the searched city above which a hotel is misplaced")
+    parser.add_argument("--within", type=float, metavar="KM",
+                        help="List the hotels within KM of the top cities")
+    parser.add_argument("--top", type=int, default=5, help="Number of top cities (by weather score) for --within")
+    args = parser.parse_args()
+
+    master = read_dataset("master")
+    checked = check_hotels(master, max_km=args.max_km)
+    located = checked["hotel_lat"].notna().sum()
+    misplaced = checked[checked["misplaced"]].sort_values("distance_km", ascending=False)
+    print(f"📍 {located}/{len(checked)} hotels have scraped coordinates, "
+          f"{len(misplaced)} are more than {args.max_km:g} km from their city")
+    if len(misplaced):
+        misplaced = misplaced.assign(reassigned=reassign(misplaced, args.max_km))
+        print(misplaced[["city", "hotel_name", "distance_km", "nearest_city", "nearest_km", "reassigned"]]
+              .round(1).head(20).to_string(index=False))
+
+    if args.within is not None:
+        top = (master[["city", "latitude", "longitude", "weather_score"]].dropna()
+               .drop_duplicates("city").nlargest(args.top, "weather_score"))
+        near = hotels_within(master, top, args.within)
+        print(f"\n🏨 {len(near)} hotels within {args.within:g} km of the top {len(top)} cities")
+        if len(near):
+            print(near[["near_city", "hotel_name", "city", "distance_km", "score"]]
+                  .round(1).head(30).to_string(index=False))
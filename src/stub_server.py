@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+import hashlib
+import time
+from aiohttp import web
+
+# --- CONFIGURATION ---
+# Offline stand-in for Nominatim (/search) and OpenWeather One Call (/onecall).
+# Point get_weather.py at it with:
+#   NOMINATIM_URL=http://127.0.0.1:8089/search ONECALL_URL=http://127.0.0.1:8089/onecall \
+#   OPENWEATHER_API_KEY=stub python src/get_weather.py --async --geocode-rate 100
+DEFAULT_PORT = 8089
+DEFAULT_LATENCY = 0.05  # seconds, roughly a warm round trip to the real APIs
+
+def _seed(text):
+    """Deterministic pseudo-random float in [0, 1) derived from a string."""
+    return int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+
+def fake_coords(query):
+    # Somewhere inside metropolitan France
+    lat = 42.5 + 8.5 * _seed("lat:" + query)
+    lon = -4.5 + 12.5 * _seed("lon:" + query)
+    return round(lat, 7), round(lon, 7)
+
+def fake_daily(lat, lon, days=8):
+    start = int(time.time()) // 86400 * 86400 + 12 * 3600
+    daily = []
+    for d in range(days):
+        s = _seed(f"{lat}:{lon}:{d}")
+        temp = 5 + 25 * s
+        daily.append({
+            "dt": start + d * 86400,
+            "temp": {"day": round(temp, 2), "min": round(temp - 4, 2), "max": round(temp + 3, 2)},
+            "weather": [{"main": "Rain" if s < 0.3 else "Clear",
+                         "description": "light rain" if s < 0.3 else "clear sky"}],
+            "pop": round(s, 2),
+            "rain": round(10 * s, 2) if s < 0.3 else 0,
+            "humidity": int(40 + 50 * s)
+        })
+    return daily
+
+def make_app(latency=DEFAULT_LATENCY):
+    stats = {"search": 0, "onecall": 0}
+
+    async def search(request):
+        stats["search"] += 1
+        await asyncio.sleep(latency)
+        lat, lon = fake_coords(request.query.get("q", ""))
+        return web.json_response([{"lat": str(lat), "lon": str(lon)}])
+
+    async def onecall(request):
+        stats["onecall"] += 1
+        await asyncio.sleep(latency)
+        try:
+            lat = float(request.query["lat"])
+            lon = float(request.query["lon"])
+        except (KeyError, ValueError):
+            return web.json_response({"message": "wrong latitude or longitude"}, status=400)
+        return web.json_response({"lat": lat, "lon": lon, "daily": fake_daily(lat, lon)})
+
+    async def stats_handler(request):
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_get("/search", search)
+    app.router.add_get("/onecall", onecall)
+    app.router.add_get("/stats", stats_handler)
+    return app
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Nominatim + One Call stub for offline throughput tests")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY, help="Artificial delay per request (s)")
+    args = parser.parse_args()
+
+    print(f"🧪 Stub server on http://127.0.0.1:{args.port} (latency {args.latency * 1000:.0f} ms)")
+    web.run_app(make_app(args.latency), host="127.0.0.1", port=args.port, print=None)
@@ -1,54 +1,217 @@
-import boto3
 import os
-from dotenv import load_dotenv
+import io
+import sys
+import gzip
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+from dataset_io import dataset_path
+from lake import BUCKET_NAME, ensure_bucket, get_client, publish_run
+import instrumentation
 
-# 1. Load Secrets
-load_dotenv()
+try:
+    import zstandard
+except ImportError:  # only needed for --compress zstd
+    zstandard = None
 
-AWS_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY_ID")
-AWS_SECRET_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
-REGION = "eu-west-3" # Paris
+# Bucket, credentials and S3_ENDPOINT_URL are configured in lake.py
 
-# ⚠️ REPLACE THIS with your own unique bucket name!
-BUCKET_NAME = "dsfs-1-enavarr-project-kayak" 
+# --- SYNC CONFIGURATION ---
+# Trees mirrored by --sync; keys are the paths relative to DATA_ROOT (raw/..., processed/...)
+DATA_ROOT = "data"
+SYNC_DIRS = ["data/raw", "data/processed"]
+# Work in progress, never uploaded
+SKIP_SUFFIXES = (".tmp", ".journal.jsonl")
+# Files uploaded in parallel (override with --workers)
+WORKERS = 8
+# Files above the threshold go up in parts of MULTIPART_CHUNKSIZE bytes (this also defines their ETag)
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+# Parts in flight per multipart file
+PART_CONCURRENCY = 4
+COMPRESSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+# Up to this many files, their ETags come from one HEAD request each instead of a bucket listing
+HEAD_MAX_KEYS = 20
+
+def local_etag(path):
+    """
+    The ETag S3 will report for this file once uploaded with the multipart settings above:
+    the MD5 for single-part uploads, md5(part md5s)-<parts> for multipart ones.
+    """
+    whole, part_md5s = hashlib.md5(), []
+    with open(path, "rb") as f:
+        for part in iter(lambda: f.read(MULTIPART_CHUNKSIZE), b""):
+            whole.update(part)
+            part_md5s.append(hashlib.md5(part).digest())
+
+    if os.path.getsize(path) < MULTIPART_THRESHOLD:
+        return whole.hexdigest()
+    return f"{hashlib.md5(b''.join(part_md5s)).hexdigest()}-{len(part_md5s)}"
+
+def remote_etags(s3, keys):
+    """
+    ETag of each of `keys` that exists in the bucket. A few keys get one HEAD request each;
+    more are read from a listing of their longest common prefix, so syncing the root-level
+    master files never pages through the whole lake/ tree.
+    """
+    etags = {}
+    if len(keys) <= HEAD_MAX_KEYS:
+        for key in keys:
+            try:
+                etags[key] = s3.head_object(Bucket=BUCKET_NAME, Key=key)["ETag"].strip('"')
+            except ClientError as e:
+                if e.response["Error"]["Code"] not in ("404", "NoSuchKey", "NotFound"):
+                    raise
+        return etags
+
+    wanted = set(keys)
+    prefix = os.path.commonprefix(sorted(wanted))
+    for page in s3.get_paginator("list_objects_v2").paginate(Bucket=BUCKET_NAME, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            if obj["Key"] in wanted:
+                etags[obj["Key"]] = obj["ETag"].strip('"')
+    return etags
+
+def compress_to(path, compression, out):
+    """Writes a compressed copy of `path` to the open binary file `out`, deterministically
+    (no timestamps in the header), so unchanged inputs keep the same ETag."""
+    with open(path, "rb") as src:
+        if compression == "gzip":
+            with gzip.GzipFile(fileobj=out, mode="wb", mtime=0, filename="") as gz:
+                shutil.copyfileobj(src, gz, io.DEFAULT_BUFFER_SIZE * 16)
+        else:
+            zstandard.ZstdCompressor(level=3).copy_stream(src, out)
+
+def sync_file(s3, path, key, compression, known_etags, transfer_config):
+    """Uploads one file unless the bucket already holds identical bytes. Returns a stats dict."""
+    size = os.path.getsize(path)
+    tmp = None
+    try:
+        upload_path = path
+        if compression != "none":
+            tmp = tempfile.NamedTemporaryFile(suffix=COMPRESSIONS[compression], delete=False)
+            with tmp, instrumentation.timer("compress"):
+                compress_to(path, compression, tmp)
+            upload_path = tmp.name
+
+        sent = os.path.getsize(upload_path)
+        with instrumentation.timer("etag"):
+            unchanged = known_etags.get(key) == local_etag(upload_path)
+        if unchanged:
+            return {"status": "skipped", "bytes": size, "sent": 0}
+
+        with instrumentation.request("s3"), instrumentation.timer("upload"):
+            s3.upload_file(upload_path, BUCKET_NAME, key, Config=transfer_config)
+        return {"status": "uploaded", "bytes": size, "sent": sent}
+    finally:
+        if tmp is not None:
+            os.remove(tmp.name)
+
+def collect_files(dirs=SYNC_DIRS):
+    """(local path, object key) for every file under `dirs`."""
+    files = []
+    for root_dir in dirs:
+        for root, _, names in os.walk(root_dir):
+            for name in sorted(names):
+                if name.endswith(SKIP_SUFFIXES):
+                    continue
+                path = os.path.join(root, name)
+                files.append((path, os.path.relpath(path, DATA_ROOT).replace(os.sep, "/")))
+    return files
+
+def sync_to_s3(files, compression="none", workers=WORKERS, prefix=""):
+    """Uploads `files` ((path, key) pairs) in parallel, skipping objects whose ETag already matches."""
+    if compression == "zstd" and zstandard is None:
+        raise RuntimeError("--compress zstd needs the `zstandard` package (pip install zstandard)")
 
-def upload_to_s3():
-    # 2. Connect to S3
     print("🔌 Connecting to AWS S3...")
-    s3 = boto3.client(
-        "s3", 
-        region_name=REGION,
-        aws_access_key_id=AWS_ACCESS_KEY,
-        aws_secret_access_key=AWS_SECRET_KEY
+    # One HTTP connection per concurrent part upload
+    s3 = get_client(workers * PART_CONCURRENCY)
+    ensure_bucket(s3)
+
+    files = [(path, prefix + key + COMPRESSIONS[compression]) for path, key in files]
+    known_etags = remote_etags(s3, [key for _, key in files])
+    transfer_config = TransferConfig(
+        multipart_threshold=MULTIPART_THRESHOLD,
+        multipart_chunksize=MULTIPART_CHUNKSIZE,
+        max_concurrency=PART_CONCURRENCY
     )
-    
-    # 3. Create Bucket (if it doesn't exist)
-    try:
-        s3.create_bucket(
-            Bucket=BUCKET_NAME,
-            CreateBucketConfiguration={'LocationConstraint': REGION}
-        )
-        print(f"✅ Bucket '{BUCKET_NAME}' created (or already exists).")
-    except Exception as e:
-        if "BucketAlreadyOwnedByYou" in str(e):
-            print(f"✅ Bucket '{BUCKET_NAME}' found.")
-        else:
-            print(f"⚠️ Warning during bucket creation: {e}")
+    print(f"⬆️ Syncing {len(files)} files to s3://{BUCKET_NAME}/{prefix} ({workers} workers, compression: {compression})...")
 
-    # 4. Upload File
-    file_path = "data/processed/kayak_master.csv"
-    object_name = "kayak_master.csv" # Name in S3
-    
-    if not os.path.exists(file_path):
-        print(f"❌ Error: File {file_path} not found. Did you run process_data.py?")
-        return
+    totals = {"uploaded": 0, "skipped": 0, "failed": 0, "bytes": 0, "sent": 0}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(sync_file, s3, path, key, compression, known_etags, transfer_config): key
+            for path, key in files
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ Upload failed for {key}: {e}")
+                instrumentation.log("upload_failed", key=key, error=str(e))
+                totals["failed"] += 1
+                continue
+            totals[result["status"]] += 1
+            totals["bytes"] += result["bytes"]
+            totals["sent"] += result["sent"]
+            if result["status"] == "uploaded":
+                print(f"   🎉 s3://{BUCKET_NAME}/{key}")
 
-    print(f"⬆️ Uploading {object_name}...")
-    try:
-        s3.upload_file(file_path, BUCKET_NAME, object_name)
-        print(f"🎉 Success! File uploaded to s3://{BUCKET_NAME}/{object_name}")
-    except Exception as e:
-        print(f"❌ Upload failed: {e}")
+    elapsed = time.perf_counter() - start
+    for status in ("uploaded", "skipped", "failed"):
+        instrumentation.count("files", totals[status], status=status)
+    instrumentation.count("bytes_sent", totals["sent"])
+    mb_sent = totals["sent"] / 1e6
+    print(f"\n📊 {totals['uploaded']} uploaded, {totals['skipped']} unchanged, {totals['failed']} failed "
+          f"in {elapsed:.2f}s")
+    print(f"   {totals['bytes'] / 1e6:.1f} MB scanned, {mb_sent:.1f} MB sent "
+          f"({mb_sent / elapsed if elapsed else 0:.1f} MB/s)")
+    return totals
+
+def upload_to_s3(compression="none", workers=WORKERS, run_date=None):
+    """
+    Publishes this run to the partitioned lake (see lake.py), then refreshes the master
+    dataset at the bucket root (Parquet for the pipeline, CSV export for the notebooks).
+    Returns True when every file made it to the bucket.
+    """
+    with instrumentation.timer("publish"):
+        publish_run(run_date, workers=workers)
+
+    files, ok = [], True
+    for file_path in (dataset_path("master"), dataset_path("master", "csv")):
+        if not os.path.exists(file_path):
+            print(f"❌ Error: File {file_path} not found. Did you run process_data.py?")
+            ok = False
+            continue
+        files.append((file_path, os.path.basename(file_path)))  # Name in S3
+    if files:
+        ok = sync_to_s3(files, compression, workers)["failed"] == 0 and ok
+    return ok
 
 if __name__ == "__main__":
-    upload_to_s3()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Upload pipeline data to the S3 data lake")
+    parser.add_argument("--sync", action="store_true",
+                        help=f"Mirror {' and '.join(SYNC_DIRS)} instead of only the master dataset")
+    parser.add_argument("--compress", choices=COMPRESSIONS, default="none",
+                        help="Compress files on the fly (adds .gz / .zst to the object key)")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Files uploaded in parallel")
+    parser.add_argument("--prefix", default="", help="Key prefix for --sync (e.g. 'runs/2026-02-19/')")
+    parser.add_argument("--run-date", help="Lake partition date for this run (default: today, UTC)")
+    instrumentation.add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with instrumentation.stage("upload", args.profile):
+        if args.sync:
+            ok = sync_to_s3(collect_files(), args.compress, args.workers, args.prefix)["failed"] == 0
+        else:
+            ok = upload_to_s3(args.compress, args.workers, args.run_date)
+    # Non-zero exit: pipeline.py must not record a failed upload as done
+    sys.exit(0 if ok else 1)
@@ -1,43 +1,63 @@
+import os
+import json
+import hashlib
+import argparse
 import pandas as pd
 import plotly.express as px
-import os
-import numpy as np
-from sqlalchemy import create_engine
-from dotenv import load_dotenv
 import textwrap
+import db
+import instrumentation
+import warehouse
+import process_data as pdata
+from map_artifacts import ARTIFACTS, BUILD_MANIFEST, cached_map, load_build_manifest
+import spatial
 
-# 1. Load Config
-load_dotenv()
-USER = os.getenv("AWS_RDS_USER")
-PASSWORD = os.getenv("AWS_RDS_PASSWORD")
-HOST = os.getenv("AWS_RDS_HOST")
-PORT = os.getenv("AWS_RDS_PORT")
-DB_NAME = os.getenv("AWS_RDS_DB_NAME")
+try:
+    import kaleido
+except ImportError:  # only needed for PNG export
+    kaleido = None
 
-def visualize_maps():
+# --- CONFIGURATION ---
+TOP_CITIES = 5
+HOTELS_PER_CITY = 20
+DESCRIPTION_CHARS = 150
+# Scraped hotel coordinates further than this from the city are treated as wrong on Map 2
+# (not spatial.MISPLACED_KM: region-level destinations like Ariege span more than 25 km)
+MAX_HOTEL_KM = 100
+
+# Build mode: pre-rendered artifacts served as static files (paths in map_artifacts.py)
+# Bump when the figure code changes, to invalidate previously built artifacts
+MAPS_VERSION = 2
+
+def fetch_map_data():
     print("🔌 Connecting to AWS RDS...")
-    conn_string = f"postgresql+psycopg2://{USER}:{PASSWORD}@{HOST}:{PORT}/{DB_NAME}"
-    engine = create_engine(conn_string)
+    # Fetch only what the maps draw: the grouping and top-N cuts run in SQL
+    with db.connection() as connection, instrumentation.timer("fetch"):
+        city_stats = warehouse.city_stats(connection)
+        top_hotels = warehouse.top_hotels(connection, TOP_CITIES, HOTELS_PER_CITY, DESCRIPTION_CHARS)
+    print(f"📥 Fetched {len(city_stats)} cities and {len(top_hotels)} hotels")
+    db.report()
+    return city_stats, top_hotels
 
-    # Fetch all data
-    df = pd.read_sql("SELECT * FROM destinations", engine)
+# Truncate to 150 chars, THEN wrap every 50 chars onto a new line
+def format_description(text):
+    if not isinstance(text, str):
+        return str(text)
     
-# --- MAP 1: ALL 35 CITIES RANKED ---
-    print("🌤️ Generating Map 1: All Destinations Ranked...")
+    # 1. Truncate (SQL sends at most DESCRIPTION_CHARS + 1 chars)
+    truncated = text[:DESCRIPTION_CHARS] + "..." if len(text) > DESCRIPTION_CHARS else text
     
-    city_stats = df.groupby('city').agg({
-        'latitude': 'first',
-        'longitude': 'first',
-        'avg_temp': 'first',
-        'total_rain_mm': 'first',
-        'climate_index': 'first', 
-        'weather_score': 'first'  
-    }).reset_index()
-
-    city_stats = city_stats.dropna(subset=['weather_score'])
+    # 2. Wrap at 50 characters (creates \n newlines)
+    wrapped = textwrap.fill(truncated, width=50)
     
-    # Sort strictly by weather score (best at the top)
-    city_stats = city_stats.sort_values(by='weather_score', ascending=False)
+    # 3. Replace standard \n with HTML <br> for Plotly
+    return wrapped.replace('\n', '<br>')
+
+def build_destinations_map(city_stats):
+    """Map 1: every scored city, sized by weather score, colored by climate index."""
+    city_stats = city_stats.copy()
+
+    # Already sorted by weather score in SQL (best at the top)
 
     # Escala no lineal, pero más contenida
     w = city_stats['weather_score']
@@ -105,53 +125,19 @@ def visualize_maps():
         borderpad=10,
         font=dict(size=13, color='black')
     )
-    
-    # Show the final map
-    fig1.show()
 
-    # --- MAP 2: TOP HOTELS IN TOP 5 CITIES ---
-    print("\n🏨 Generating Map 2: Top 20 Hotels across the Top 5 Cities...")
-    
-    top_5_cities = city_stats.head(5)['city'].tolist()
-    
-    df_top_5 = df[df['city'].isin(top_5_cities)].copy()
-    
-    # FIX: Convert to numeric, and fill missing scores (NaN) with a baseline of 5.0
-    # This prevents Plotly from crashing when sizing the dots!
-    df_top_5['score'] = pd.to_numeric(df_top_5['score'], errors='coerce').fillna(5.0)
-    
-    df_top_5 = df_top_5.sort_values(by=['city', 'score'], ascending=[True, False])
-    top_100_hotels = df_top_5.groupby('city').head(20).copy()
+    return fig1
 
-    final_lats = []
-    final_lons = []
+def build_hotels_map(top_100_hotels):
+    """Map 2: the top hotels of the best cities, sized and colored by review score."""
+    top_100_hotels = top_100_hotels.copy()
 
-    for index, row in top_100_hotels.iterrows():
-        if pd.notna(row.get('hotel_lat')) and pd.notna(row.get('hotel_lon')):
-            final_lats.append(row['hotel_lat'])
-            final_lons.append(row['hotel_lon'])
-        else:
-            jitter_lat = row['latitude'] + np.random.uniform(-0.015, 0.015)
-            jitter_lon = row['longitude'] + np.random.uniform(-0.015, 0.015)
-            final_lats.append(jitter_lat)
-            final_lons.append(jitter_lon)
-
-    top_100_hotels['map_lat'] = final_lats
-    top_100_hotels['map_lon'] = final_lons
+    # Missing scores come back as a 5.0 baseline (COALESCE in SQL),
+    # which prevents Plotly from crashing when sizing the dots!
 
-# Truncate to 150 chars, THEN wrap every 50 chars onto a new line
-    def format_description(text):
-        if not isinstance(text, str):
-            return str(text)
-        
-        # 1. Truncate
-        truncated = text[:150] + "..." if len(text) > 150 else text
-        
-        # 2. Wrap at 50 characters (creates \n newlines)
-        wrapped = textwrap.fill(truncated, width=50)
-        
-        # 3. Replace standard \n with HTML <br> for Plotly
-        return wrapped.replace('\n', '<br>')
+    # Scraped coordinates, or a fixed spot near the city centroid when they are
+    # missing or too far from the city (same spot on every build)
+    top_100_hotels['map_lat'], top_100_hotels['map_lon'] = spatial.map_coordinates(top_100_hotels, MAX_HOTEL_KM)
 
     top_100_hotels['short_desc'] = top_100_hotels['description'].apply(format_description)
 
@@ -195,8 +181,115 @@ def visualize_maps():
         borderpad=10,
         font=dict(size=13, color='black')
     )
-    
+
+    return fig2
+
+def visualize_maps():
+    city_stats, top_100_hotels = fetch_map_data()
+
+# --- MAP 1: ALL 35 CITIES RANKED ---
+    print("🌤️ Generating Map 1: All Destinations Ranked...")
+    # Show the final map
+    build_destinations_map(city_stats).show()
+
+    # --- MAP 2: TOP HOTELS IN TOP 5 CITIES ---
+    print("\n🏨 Generating Map 2: Top 20 Hotels across the Top 5 Cities...")
     # Show the final Map 2
-    fig2.show()
+    build_hotels_map(top_100_hotels).show()
+
+def build_key(city_stats, top_hotels):
+    """Hash of everything the maps depend on: the fetched rows and the scoring/map parameters."""
+    params = {
+        "maps_version": MAPS_VERSION,
+        "top_cities": TOP_CITIES,
+        "hotels_per_city": HOTELS_PER_CITY,
+        "description_chars": DESCRIPTION_CHARS,
+        "max_hotel_km": MAX_HOTEL_KM,
+        "scoring": [pdata.TARGET_TEMP, pdata.HOT_PENALTY_MULT, pdata.COLD_PENALTY_MULT,
+                    pdata.RAIN_PENALTY_MULT, pdata.HUMID_PENALTY_MULT]
+    }
+    h = hashlib.sha256(json.dumps(params, sort_keys=True).encode())
+    for df in (city_stats, top_hotels):
+        h.update(",".join(df.columns).encode())
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def _write_atomic(path, write):
+    tmp_path = path + ".tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+def build_maps(png=False, force=False):
+    """
+    Writes both maps as static HTML (+ figure JSON, + PNG with png=True, which needs `kaleido`).
+    Reuses the existing artifacts when the data and parameters hash to the last build's key.
+    Returns {map name: {format: path}}.
+    """
+    if png and kaleido is None:
+        print("⚠️ PNG export needs `kaleido` (pip install kaleido), building HTML/JSON only.")
+        png = False
+
+    city_stats, top_hotels = fetch_map_data()
+    key = build_key(city_stats, top_hotels)
+    formats = ["html", "json"] + (["png"] if png else [])
+
+    manifest = load_build_manifest()
+    artifacts = manifest.get("artifacts", {})
+    cached = manifest.get("key") == key and all(
+        fmt in artifacts.get(name, {}) and os.path.exists(artifacts[name][fmt])
+        for name in ARTIFACTS for fmt in formats
+    )
+    if cached and not force:
+        print(f"♻️ Maps unchanged (key {key[:12]}), reusing {BUILD_MANIFEST}")
+        instrumentation.count("cache_hits")
+        return artifacts
+
+    print(f"🛠️ Building maps (key {key[:12]})...")
+    with instrumentation.timer("build"):
+        figures = {"map1": build_destinations_map(city_stats), "map2": build_hotels_map(top_hotels)}
+    artifacts = {}
+    for name, fig in figures.items():
+        base = ARTIFACTS[name]
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        writers = {
+            "html": lambda p: fig.write_html(p, include_plotlyjs="cdn", full_html=True),
+            "json": lambda p: fig.write_json(p),
+            "png": lambda p: fig.write_image(p, format="png", width=1600, height=1000)
+        }
+        artifacts[name] = {}
+        for fmt in formats:
+            path = f"{base}.{fmt}"
+            try:
+                with instrumentation.timer(f"write_{fmt}"):
+                    _write_atomic(path, writers[fmt])
+            except Exception as e:
+                if fmt != "png":
+                    raise
+                # Kaleido also needs a Chrome install; the HTML/JSON maps are still usable
+                print(f"   ⚠️ PNG export failed for {name}: {str(e).strip().splitlines()[0]}")
+                instrumentation.count("errors", kind="png_export")
+                continue
+            artifacts[name][fmt] = path
+            print(f"   💾 {path}")
+
+    # Manifest last: a half-finished build is never mistaken for a cached one
+    def write_manifest(path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "artifacts": artifacts}, f, indent=2)
+    _write_atomic(BUILD_MANIFEST, write_manifest)
+    return artifacts
+
 if __name__ == "__main__":
-    visualize_maps()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Plotly maps of the best destinations and hotels")
+    parser.add_argument("--build", action="store_true",
+                        help="Write the maps to assets/ as static HTML/JSON instead of opening them")
+    parser.add_argument("--png", action="store_true", help="With --build, also export PNGs (needs kaleido)")
+    parser.add_argument("--force", action="store_true", help="With --build, rebuild even if the inputs are unchanged")
+    instrumentation.add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with instrumentation.stage("maps", args.profile):
+        if args.build:
+            build_maps(args.png, args.force)
+        else:
+            visualize_maps()
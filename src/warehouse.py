@@ -0,0 +1,184 @@
+import pandas as pd
+from sqlalchemy import inspect, text
+
+# --- CONFIGURATION ---
+# Normalized warehouse schema. City-level metrics live once in `cities`, hotels reference
+# their city by city_id, and the forecast days behind each city's score are kept in
+# `daily_forecasts`. The old wide table survives as the `destinations` view.
+# Column types are plain SQL understood by both PostgreSQL and SQLite.
+TABLES = {
+    "cities": {
+        "columns": {
+            "city_id": "INTEGER NOT NULL",
+            "city": "TEXT NOT NULL",
+            "latitude": "DOUBLE PRECISION",
+            "longitude": "DOUBLE PRECISION",
+            "avg_temp": "DOUBLE PRECISION",
+            "total_rain_mm": "DOUBLE PRECISION",
+            "climate_index": "DOUBLE PRECISION",
+            "weather_score": "DOUBLE PRECISION"
+        },
+        "primary_key": ["city_id"]
+    },
+    "hotels": {
+        "columns": {
+            "hotel_key": "TEXT NOT NULL",
+            "city_id": "INTEGER NOT NULL",
+            "hotel_name": "TEXT",
+            "url": "TEXT",
+            "score": "NUMERIC",  # NULL when Booking shows no review score
+            "description": "TEXT",
+            "hotel_lat": "DOUBLE PRECISION",
+            "hotel_lon": "DOUBLE PRECISION",
+            "row_hash": "BIGINT"
+        },
+        "primary_key": ["hotel_key"]
+    },
+    "daily_forecasts": {
+        "columns": {
+            "city_id": "INTEGER NOT NULL",
+            "date": "DATE NOT NULL",
+            "day_offset": "INTEGER",
+            "temp_day": "DOUBLE PRECISION",
+            "temp_min": "DOUBLE PRECISION",
+            "temp_max": "DOUBLE PRECISION",
+            "weather_main": "TEXT",
+            "weather_description": "TEXT",
+            "pop": "DOUBLE PRECISION",
+            "rain": "DOUBLE PRECISION",
+            "humidity": "INTEGER"
+        },
+        "primary_key": ["city_id", "date"]
+    }
+}
+
+# (name, table, columns): top-N cities by score, top-K hotels per city
+INDEXES = [
+    ("ix_cities_weather_score", "cities", ["weather_score"]),
+    ("ix_cities_city", "cities", ["city"]),
+    ("ix_hotels_city_id_score", "hotels", ["city_id", "score"])
+]
+
+VIEW_NAME = "destinations"
+# Same columns, in the same order, as the former destinations table
+VIEW_SQL = f"""
+CREATE VIEW {VIEW_NAME} AS
+SELECT c.city_id, c.city, h.hotel_name, h.url, h.score, h.description,
+       h.hotel_lat, h.hotel_lon, c.weather_score, c.climate_index,
+       c.avg_temp, c.total_rain_mm, c.latitude, c.longitude,
+       h.hotel_key, h.row_hash
+FROM hotels h
+JOIN cities c ON c.city_id = h.city_id
+"""
+
+def create_table(connection, name, table_name=None):
+    """Creates table `name` from TABLES, optionally under another name (e.g. a staging copy)."""
+    spec = TABLES[name]
+    table_name = table_name or name
+    columns = [f'"{col}" {sql_type}' for col, sql_type in spec["columns"].items()]
+    pk = ", ".join(f'"{col}"' for col in spec["primary_key"])
+    connection.execute(text(f'CREATE TABLE "{table_name}" ({", ".join(columns)}, PRIMARY KEY ({pk}))'))
+
+def create_indexes(connection):
+    for name, table, columns in INDEXES:
+        cols = ", ".join(f'"{col}"' for col in columns)
+        connection.execute(text(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({cols})'))
+
+def drop_view(connection):
+    """Drops the destinations view, or the wide destinations table older loads created."""
+    inspector = inspect(connection)
+    if VIEW_NAME in inspector.get_view_names():
+        connection.execute(text(f'DROP VIEW "{VIEW_NAME}"'))
+    elif inspector.has_table(VIEW_NAME):
+        connection.execute(text(f'DROP TABLE "{VIEW_NAME}"'))
+
+def create_view(connection):
+    connection.execute(text(VIEW_SQL))
+
+def has_schema(connection):
+    inspector = inspect(connection)
+    return all(inspector.has_table(name) for name in TABLES) and VIEW_NAME in inspector.get_view_names()
+
+def split_master(df_master):
+    """
+    Splits the wide master dataset into (cities, hotels) frames with the warehouse columns.
+    Hotels without a city_id (their city is not in data/cities.txt) are left out.
+    """
+    orphans = df_master["city_id"].isna()
+    if orphans.any():
+        skipped = df_master.loc[orphans, "city"].astype(str).value_counts()
+        print(f"⚠️ {orphans.sum()} hotels skipped, city not in data/cities.txt: "
+              + ", ".join(f"{city} ({n})" for city, n in skipped.items()))
+        df_master = df_master[~orphans].copy()
+        df_master["city_id"] = df_master["city_id"].astype(int)
+    city_cols = list(TABLES["cities"]["columns"])
+    cities = (
+        df_master[city_cols]
+        .drop_duplicates(subset="city_id")
+        .sort_values("city_id")
+        .reset_index(drop=True)
+    )
+    cities["city"] = cities["city"].astype(str)
+
+    hotels = df_master[list(TABLES["hotels"]["columns"])].copy()
+    hotels["score"] = pd.to_numeric(hotels["score"], errors="coerce")
+    return cities, hotels.reset_index(drop=True)
+
+def forecast_frame(df_weather, cities):
+    """Forecast rows keyed by city_id; cities missing from the master dataset are left out."""
+    city_ids = dict(zip(cities["city"], cities["city_id"]))
+    df = df_weather.copy()
+    df["city_id"] = df["city"].astype(str).map(city_ids)
+    df = df.dropna(subset=["city_id"])
+    df["city_id"] = df["city_id"].astype(int)
+    # One row per city and calendar day
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    df = df.drop_duplicates(subset=TABLES["daily_forecasts"]["primary_key"])
+    return df[list(TABLES["daily_forecasts"]["columns"])].reset_index(drop=True)
+
+# --- READ QUERIES (aggregation and top-N run in the database) ---
+CITY_STATS_SQL = """
+SELECT city, latitude, longitude, avg_temp, total_rain_mm, climate_index, weather_score
+FROM cities
+WHERE weather_score IS NOT NULL
+ORDER BY weather_score DESC, city
+"""
+
+# Best `per_city` hotels of the `n_cities` best cities, with only the columns the maps use.
+# Hotels without a review score rank as 5.0; descriptions are cut to what the tooltip shows (+1 char
+# so the map can still tell a cut text from a short one).
+TOP_HOTELS_SQL = """
+WITH top_cities AS (
+    SELECT city_id
+    FROM cities
+    WHERE weather_score IS NOT NULL
+    ORDER BY weather_score DESC, city
+    LIMIT :n_cities
+),
+ranked AS (
+    SELECT c.city, h.hotel_name,
+           CAST(COALESCE(h.score, 5.0) AS DOUBLE PRECISION) AS score,
+           SUBSTR(h.description, 1, :desc_chars + 1) AS description,
+           h.hotel_lat, h.hotel_lon, c.latitude, c.longitude, c.weather_score,
+           ROW_NUMBER() OVER (
+               PARTITION BY h.city_id
+               ORDER BY COALESCE(h.score, 5.0) DESC, h.hotel_key
+           ) AS rank_in_city
+    FROM hotels h
+    JOIN top_cities t ON t.city_id = h.city_id
+    JOIN cities c ON c.city_id = h.city_id
+)
+SELECT city, hotel_name, score, description, hotel_lat, hotel_lon, latitude, longitude, weather_score
+FROM ranked
+WHERE rank_in_city <= :per_city
+ORDER BY city, score DESC, rank_in_city
+"""
+
+def city_stats(connection):
+    """One row per scored city, best weather first."""
+    return pd.read_sql(text(CITY_STATS_SQL), connection)
+
+def top_hotels(connection, n_cities=5, per_city=20, desc_chars=150):
+    """The top `per_city` hotels (by review score) of each of the `n_cities` best cities."""
+    params = {"n_cities": n_cities, "per_city": per_city, "desc_chars": desc_chars}
+    return pd.read_sql(text(TOP_HOTELS_SQL), connection, params=params)
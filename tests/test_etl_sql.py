@@ -0,0 +1,96 @@
+"""
+load_with_swap() on a throwaway SQLite database: repeated loads replace the tables without
+leaving staging copies behind, and a load that fails half-way rolls back to the previous one.
+"""
+import os
+import sys
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import db
+import etl_sql
+import warehouse
+
+def master(cities=3, hotels_per_city=4):
+    rows = []
+    for c in range(cities):
+        for h in range(hotels_per_city):
+            rows.append({
+                "city_id": c + 1, "city": f"City {c}",
+                "hotel_name": f"Hotel {c}-{h}", "url": f"https://www.booking.com/hotel/fr/h{c}-{h}.html",
+                "score": 7.5 + h / 10, "description": "Nice place",
+                "hotel_lat": 45.0 + c, "hotel_lon": 3.0 + h / 100,
+                "weather_score": 10.0 * c, "climate_index": 1.0, "avg_temp": 20.0,
+                "total_rain_mm": 2.0, "latitude": 45.0 + c, "longitude": 3.0
+            })
+    return pd.DataFrame(rows, columns=etl_sql.MASTER_COLUMNS)
+
+def weather(cities=3, days=3):
+    return pd.DataFrame({
+        "city": [f"City {c}" for c in range(cities) for _ in range(days)],
+        "date": [f"2026-06-0{d + 1}" for _ in range(cities) for d in range(days)],
+        "day_offset": [d for _ in range(cities) for d in range(days)],
+        "temp_day": 21.0, "temp_min": 15.0, "temp_max": 26.0,
+        "weather_main": "Clear", "weather_description": "clear sky",
+        "pop": 0.1, "rain": 0.0, "humidity": 60
+    })
+
+def frames(cities=3, hotels_per_city=4):
+    return etl_sql.build_frames(etl_sql.add_keys(master(cities, hotels_per_city)), weather(cities))
+
+@pytest.fixture
+def engine(tmp_path):
+    # The project engine setup, on a file database of our own
+    engine = db._create_engine(f"sqlite:///{tmp_path / 'warehouse.db'}")
+    yield engine
+    engine.dispose()
+
+def counts(engine):
+    with engine.connect() as connection:
+        return {name: connection.execute(text(f'SELECT COUNT(*) FROM "{name}"')).scalar()
+                for name in list(warehouse.TABLES) + [warehouse.VIEW_NAME]}
+
+def test_swap_twice_replaces_tables(engine):
+    with engine.begin() as connection:
+        assert etl_sql.load_with_swap(connection, frames()) == 12
+    with engine.begin() as connection:
+        assert etl_sql.load_with_swap(connection, frames(cities=2, hotels_per_city=5)) == 10
+
+    assert counts(engine) == {"cities": 2, "hotels": 10, "daily_forecasts": 6, warehouse.VIEW_NAME: 10}
+    inspector = inspect(engine)
+    leftovers = [t for t in inspector.get_table_names() if t.endswith(("_staging", "_old"))]
+    assert leftovers == []
+    assert inspector.get_view_names() == [warehouse.VIEW_NAME]
+
+def test_failed_swap_rolls_back(engine, monkeypatch):
+    with engine.begin() as connection:
+        etl_sql.load_with_swap(connection, frames())
+    before = counts(engine)
+
+    # Fail after the live tables were renamed away, before the view is back
+    def broken_view(connection):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(warehouse, "create_view", broken_view)
+    with pytest.raises(RuntimeError):
+        with engine.begin() as connection:
+            etl_sql.load_with_swap(connection, frames(cities=2, hotels_per_city=5))
+
+    assert counts(engine) == before
+    inspector = inspect(engine)
+    assert sorted(inspector.get_table_names()) == sorted(warehouse.TABLES)
+    assert inspector.get_view_names() == [warehouse.VIEW_NAME]
+
+def test_hotels_of_unknown_cities_are_skipped(engine, capsys):
+    df = master()
+    # A hotel whose city is not in data/cities.txt: build_master leaves its city_id empty
+    nowhere = df.iloc[[0]].assign(city_id=float("nan"), city="Nowhere", hotel_name="Lost Inn",
+                                  url="https://www.booking.com/hotel/fr/lost-inn.html")
+    df = pd.concat([df, nowhere], ignore_index=True)
+
+    with engine.begin() as connection:
+        assert etl_sql.load_with_swap(connection, etl_sql.build_frames(etl_sql.add_keys(df), weather())) == 12
+    assert "1 hotels skipped" in capsys.readouterr().out
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(*) FROM hotels WHERE hotel_name = 'Lost Inn'")).scalar() == 0
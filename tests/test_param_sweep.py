@@ -0,0 +1,45 @@
+"""
+The parameter sweep must rank cities like production scoring (process_data.py)
+when run with the production parameters, missing forecast values included.
+"""
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import process_data as pdata
+from param_sweep import city_scores, make_grid
+
+def planning(cities=12, days=5, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = cities * days
+    df = pd.DataFrame({
+        "city": np.repeat([f"City {i:02d}" for i in range(cities)], days),
+        "latitude": 45.0,
+        "longitude": 3.0,
+        "day_offset": np.tile(np.arange(2, 2 + days), cities),
+        "temp_day": rng.uniform(-5, 40, rows).round(2),
+        "rain": rng.exponential(2, rows).round(2),
+        "humidity": rng.integers(20, 101, rows).astype(float)
+    })
+    # Missing values on some days, and one city without any usable temperature
+    df.loc[[3, 17, 28], "temp_day"] = np.nan
+    df.loc[[8, 40], "rain"] = np.nan
+    df.loc[df["city"] == "City 05", "temp_day"] = np.nan
+    return df
+
+def test_baseline_scores_match_process_data():
+    df = planning()
+    scores, cities = city_scores(df, make_grid())
+    expected = pdata.summarize_weather(df.copy()).set_index("city")["weather_score"]
+    np.testing.assert_allclose(scores[0], expected.reindex(cities).to_numpy(), rtol=1e-12, equal_nan=True)
+
+def test_missing_daily_scores_are_skipped(monkeypatch):
+    # Daily "scores" that are NaN on some days: each city's mean must skip them, like groupby().mean()
+    import param_sweep
+    monkeypatch.setattr(param_sweep, "weather_score", lambda temp, rain, humidity, target_temp, *mults: temp * np.ones_like(target_temp))
+    df = planning()
+    scores, cities = param_sweep.city_scores(df, make_grid())
+    expected = df.groupby("city")["temp_day"].mean().reindex(cities).to_numpy()
+    np.testing.assert_allclose(scores[0], expected, rtol=1e-12, equal_nan=True)
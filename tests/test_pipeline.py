@@ -0,0 +1,36 @@
+"""
+A stage whose script exits non-zero must not be recorded as done: the next run has to
+retry it instead of skipping it as up to date, and the stages after it must not run.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import pipeline
+
+def stub_stages(tmp_path):
+    (tmp_path / "ok.py").write_text("print('✅ done')\n", encoding="utf-8")
+    # Like etl_sql.py / upload_s3.py on a database or S3 error
+    (tmp_path / "fails.py").write_text("import sys\nprint('❌ Database Error: boom')\nsys.exit(1)\n",
+                                       encoding="utf-8")
+    return {
+        "first": {"script": "ok.py", "args": [], "needs": [], "inputs": [], "outputs": []},
+        "load": {"script": "fails.py", "args": [], "needs": ["first"], "inputs": [], "outputs": []},
+        "after": {"script": "ok.py", "args": [], "needs": ["load"], "inputs": [], "outputs": []}
+    }
+
+def test_failing_stage_is_not_marked_fresh(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pipeline, "STAGES", stub_stages(tmp_path))
+    monkeypatch.setattr(pipeline, "STATE_PATH", str(tmp_path / "state.json"))
+
+    assert pipeline.run_pipeline() is False
+    state = pipeline.load_state()
+    assert "first" in state
+    assert "load" not in state
+    assert "after" not in state
+    assert not pipeline.is_fresh("load", pipeline.fingerprint("load"), state)
+
+    # Second run: the successful stage is skipped, the failed one runs (and fails) again
+    assert pipeline.run_pipeline() is False
+    assert "load" not in pipeline.load_state()
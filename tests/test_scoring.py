@@ -0,0 +1,44 @@
+"""
+Parity of the vectorized scoring (src/scoring.py) with the row-wise reference in
+process_data.py. Runs in a second or two:
+
+    python -m pytest tests/
+"""
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import process_data as pdata
+from scoring import climate_index, weather_score
+
+def forecasts(rows=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "temp_day": rng.uniform(-15, 45, rows).round(2),
+        "rain": np.where(rng.random(rows) < 0.6, 0, rng.exponential(4, rows).round(2)),
+        "humidity": rng.integers(10, 101, rows)
+    })
+    # Values sitting exactly on the branch/clamp boundaries, and missing data
+    edge = pd.DataFrame({
+        "temp_day": [pdata.TARGET_TEMP, 5.0, 45.0, -50.0, 80.0, np.nan, 20.0, 25.0],
+        "rain": [0, 0, 0, 0, 0, 0, np.nan, 1e9],
+        "humidity": [60, 60, 100, 0, 0, 50, 60, 60]
+    })
+    return pd.concat([edge, df], ignore_index=True)
+
+def test_climate_index_matches_row_wise():
+    df = forecasts()
+    expected = df.apply(pdata.calculate_climate_index, axis=1).to_numpy(dtype=float)
+    actual = climate_index(df["temp_day"], pdata.TARGET_TEMP, pdata.HOT_PENALTY_MULT, pdata.COLD_PENALTY_MULT)
+    assert np.array_equal(expected, actual, equal_nan=True)
+
+def test_weather_score_matches_row_wise():
+    df = forecasts()
+    expected = df.apply(pdata.calculate_weather_score, axis=1).to_numpy(dtype=float)
+    actual = weather_score(
+        df["temp_day"], df["rain"], df["humidity"], pdata.TARGET_TEMP, pdata.HOT_PENALTY_MULT,
+        pdata.COLD_PENALTY_MULT, pdata.RAIN_PENALTY_MULT, pdata.HUMID_PENALTY_MULT
+    )
+    assert np.array_equal(expected, actual, equal_nan=True)